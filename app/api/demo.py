@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from app.models.database import get_db
 from app.services.social_simulator import social_simulator
 from app.services.conversation_manager import get_conversation_manager
+from app.services.llm_scheduler import PRIORITY_LOW
 import logging
 
 router = APIRouter(prefix="/demo", tags=["demo"])
@@ -28,14 +30,15 @@ async def process_simulated_message(
     """Process simulated message with real AI"""
     # Use your actual AI to generate response
     conversation_manager = get_conversation_manager(db)
-    result = await conversation_manager.process_message(
+    result = await conversation_manager.aprocess_message(
         user_message=message,
         social_media_id=user_id,
-        platform=platform
+        platform=platform,
+        priority=PRIORITY_LOW  # demo traffic yields to real customers
     )
     
     # Simulate the AI response
-    ai_response = social_simulator.simulate_ai_response(user_id, result["response"])
+    ai_response = social_simulator.simulate_ai_response(user_id, result["response"], result["intent"])
     
     return {
         "status": "processed",
@@ -49,16 +52,8 @@ async def investor_dashboard():
     """Investor demo dashboard with statistics"""
     stats = social_simulator.get_demo_statistics()
     
-    # Simulate some recent activity
-    recent_activity = []
-    for user in social_simulator.demo_users[:3]:  # Show first 3 users
-        history = social_simulator.get_conversation_history(user["id"])
-        if history:
-            recent_activity.append({
-                "user": user,
-                "last_message": history[-1]["message"],
-                "message_count": len(history)
-            })
+    # Most recently active users
+    recent_activity = social_simulator.recent_activity(3)
     
     return {
         "dashboard_title": "🤖 AI Business Scaling Agent - Investor Demo",
@@ -90,16 +85,18 @@ async def live_investor_demo(db: Session = Depends(get_db)):
     
     # Step 2: Process with real AI
     conversation_manager = get_conversation_manager(db)
-    result = await conversation_manager.process_message(
+    result = await conversation_manager.aprocess_message(
         user_message=simulated_msg["message"],
         social_media_id=simulated_msg["user_id"],
-        platform=simulated_msg["platform"]
+        platform=simulated_msg["platform"],
+        priority=PRIORITY_LOW
     )
     
     # Step 3: Simulate AI response
     ai_response = social_simulator.simulate_ai_response(
         simulated_msg["user_id"],
-        result["response"]
+        result["response"],
+        result["intent"]
     )
     
     return {
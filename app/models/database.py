@@ -1,17 +1,28 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, Boolean, JSON, Float
+import logging
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, JSON, Float, Index, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
 from config.settings import settings
 from config.security import encryptor
+from app.utils.pii_cache import pii_cache
+from app.utils.instrumentation import instrument_engine
+from app.models.storage_profile import build_engine, describe_storage
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
 class SecureSession:
     def __init__(self):
-        self.engine = create_engine(settings.DATABASE_URL)
+        self.engine, self.storage_profile = build_engine(settings)
+        instrument_engine(self.engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
     
+    def storage_report(self):
+        """What the storage profile applied, as reported by the database"""
+        return describe_storage(self.engine, self.storage_profile)
+    
     def get_db(self):
         db = self.SessionLocal()
         try:
@@ -23,10 +34,16 @@ secure_session = SecureSession()
 
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = (
+        Index("uq_customers_platform_social_media_id", "platform", "social_media_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email_encrypted = Column(String(255))
     phone_encrypted = Column(String(255))
+    # Keyed HMACs of the normalized email/phone: equality lookups without decrypting rows
+    email_bidx = Column(String(64), index=True)
+    phone_bidx = Column(String(64), index=True)
     social_media_id = Column(String(255), index=True)
     platform = Column(String(50))
     first_name = Column(String(100))
@@ -35,9 +52,17 @@ class Customer(Base):
     
     def set_email(self, email: str):
         self.email_encrypted = encryptor.encrypt(email)
+        self.email_bidx = encryptor.blind_index(email, "email")
     
     def get_email(self) -> str:
-        return encryptor.decrypt(self.email_encrypted) if self.email_encrypted else ""
+        return pii_cache.decrypt(self.email_encrypted)
+    
+    def set_phone(self, phone: str):
+        self.phone_encrypted = encryptor.encrypt(phone)
+        self.phone_bidx = encryptor.blind_index(phone, "phone")
+    
+    def get_phone(self) -> str:
+        return pii_cache.decrypt(self.phone_encrypted)
 
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -51,14 +76,69 @@ class Conversation(Base):
     requires_human = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class CustomerStats(Base):
+    """Per-customer aggregates maintained incrementally when conversations are saved"""
+    __tablename__ = "customer_stats"
+    
+    customer_id = Column(Integer, primary_key=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    escalation_count = Column(Integer, nullable=False, default=0)
+    last_intent = Column(String(100))
+    last_seen_at = Column(DateTime(timezone=True))
+
+class ConversationSummary(Base):
+    """Rolling per-customer digest of past messages, folded in as conversations are saved"""
+    __tablename__ = "conversation_summaries"
+    
+    customer_id = Column(Integer, primary_key=True)
+    turns = Column(Integer, nullable=False, default=0)
+    intent_counts = Column(JSON)  # {"order_status": 3, ...}
+    notes = Column(JSON)  # most recent customer messages, oldest first, truncated
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class OrderCache(Base):
     __tablename__ = "order_cache"
     
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(String(100), unique=True, index=True)
-    customer_email = Column(String(255))
-    order_data = Column(JSON)  # Stores full order details as JSON
+    customer_email = Column(String(255), index=True)  # blind index of the order email, never plaintext
+    order_data = Column(JSON)  # Stores full order details as JSON (minus the email)
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
 
+def ensure_columns(engine):
+    """Add nullable columns introduced after a table was first created (values are backfilled separately)"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+def ensure_indexes(engine):
+    """Add indexes introduced after a table was first created (create_all skips existing tables)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                logger.warning(f"Could not create index {index.name}: {e}. Resolve duplicate rows and restart.")
+
+def get_db():
+    """FastAPI dependency: one session per request"""
+    db = secure_session.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # Create all tables
-Base.metadata.create_all(bind=secure_session.engine)
\ No newline at end of file
+Base.metadata.create_all(bind=secure_session.engine)
+ensure_columns(secure_session.engine)
+ensure_indexes(secure_session.engine)
\ No newline at end of file
@@ -0,0 +1,89 @@
+import logging
+from typing import Dict, Any, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+SQLITE_REPORTED_PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size")
+SQLITE_MIN_CACHE_KB = 2048  # SQLite's own default
+
+def sqlite_cache_kb(settings) -> int:
+    """Per-connection page cache: the cache is per connection, so the budget is divided across the pool"""
+    connections = max(1, settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    return max(SQLITE_MIN_CACHE_KB, settings.SQLITE_CACHE_BUDGET_KB // connections)
+
+def _sqlite_pragmas(settings) -> Dict[str, Any]:
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": -sqlite_cache_kb(settings)  # negative = KiB rather than pages
+    }
+
+def build_engine(settings) -> Tuple[Engine, Dict[str, Any]]:
+    """
+    Create the SQLAlchemy engine for the configured storage profile.
+
+    "tuned" applies WAL and connection pragmas on SQLite, and pool sizing / pre-ping /
+    recycle on server databases. "default" keeps driver defaults. Returns the engine and
+    a report of what was requested.
+    """
+    url = make_url(settings.DATABASE_URL)
+    dialect = url.get_backend_name()
+    report: Dict[str, Any] = {"profile": settings.STORAGE_PROFILE, "dialect": dialect, "applied": {}}
+
+    if settings.STORAGE_PROFILE != "tuned":
+        return create_engine(settings.DATABASE_URL), report
+
+    if dialect == "sqlite":
+        in_memory = url.database in (None, "", ":memory:")
+        pragmas = _sqlite_pragmas(settings)
+        if in_memory:
+            pragmas.pop("journal_mode")  # WAL needs a file
+            engine = create_engine(settings.DATABASE_URL)
+        else:
+            engine = create_engine(
+                settings.DATABASE_URL,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+                connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+            )
+
+        @event.listens_for(engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+        report["applied"] = dict(pragmas)
+        if not in_memory:
+            report["applied"].update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+        return engine, report
+
+    pool = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE
+    }
+    report["applied"] = dict(pool)
+    return create_engine(settings.DATABASE_URL, **pool), report
+
+def describe_storage(engine: Engine, report: Dict[str, Any]) -> Dict[str, Any]:
+    """Startup report: requested settings plus what the database actually reports"""
+    effective: Dict[str, Any] = {}
+    try:
+        with engine.connect() as connection:
+            if engine.dialect.name == "sqlite":
+                for name in SQLITE_REPORTED_PRAGMAS:
+                    effective[name] = connection.execute(text(f"PRAGMA {name}")).scalar()
+            effective["pool"] = engine.pool.status()
+    except Exception as e:
+        effective["error"] = str(e)
+    return {**report, "effective": effective}
@@ -1,154 +1,351 @@
 import os
+import asyncio
+import json
 import logging
-from typing import Dict, Any, List
-import requests
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator
+import httpx
 from dotenv import load_dotenv
 
+from config.settings import settings
+from app.utils.instrumentation import count, span
+from app.utils.metrics import metrics
+from app.services.model_router import model_router
+from app.services.response_cache import response_cache
+from app.services.keyword_matcher import keyword_matcher, KeywordMatch
+from app.services.prompt_builder import prompt_builder, estimate_tokens, MESSAGE_OVERHEAD_TOKENS
+from app.services.llm_scheduler import llm_scheduler, SchedulerTimeout, PRIORITY_NORMAL
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+MAX_COMPLETION_TOKENS = 500
+
+# _handle_response result for a 429: a quota problem, not a model failure
+RATE_LIMITED = object()
+
 class AIService:
     def __init__(self):
         self.groq_api_key = os.getenv("GROQ_API_KEY")
-        self.base_url = "https://api.groq.com/openai/v1"
+        self.base_url = settings.GROQ_BASE_URL.rstrip("/")
         self.conversation_history = {}
+        self._async_client: Optional[httpx.AsyncClient] = None
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Shared pooled (HTTP/2 when available) client for the async path"""
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                http2=settings.GROQ_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=settings.GROQ_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(settings.GROQ_TIMEOUT, connect=settings.GROQ_CONNECT_TIMEOUT)
+            )
+        return self._async_client
+    
+    async def aclose(self):
+        """Close pooled connections (called from the app lifespan)"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.groq_api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _build_messages(self, user_message: str, customer_context: Dict[str, Any] = None, conversation_history: List[Dict] = None) -> List[Dict]:
+        """Build the chat messages sent to the model (token-budgeted)"""
+        with span("prompt"):
+            return prompt_builder.build(user_message, customer_context, conversation_history)
+    
+    def _build_payload(self, model: str, messages: List[Dict]) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": MAX_COMPLETION_TOKENS
+        }
+    
+    @staticmethod
+    def _estimate_request_tokens(messages: List[Dict]) -> int:
+        """What the request counts against the tokens-per-minute quota"""
+        return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages) + MAX_COMPLETION_TOKENS
+    
+    def _build_result(self, match: KeywordMatch, ai_response: str) -> Dict[str, Any]:
+        """Turn a completed model answer into the service result"""
+        return {
+            "response": ai_response,
+            "intent": match.intent,
+            "requires_human": match.requires_human,
+            "confidence": 0.9
+        }
+    
+    @staticmethod
+    def _record_call(model: str, outcome: str, latency: float, usage: Optional[Dict[str, Any]] = None):
+        """Per-model latency/outcome histogram and token usage from the provider's usage field"""
+        metrics.observe("llm_request_duration_seconds", latency, model=model, status=outcome)
+        if usage:
+            for kind in ("prompt", "completion"):
+                tokens = usage.get(f"{kind}_tokens") or 0
+                metrics.inc("llm_tokens_total", tokens, model=model, type=kind)
+                count(f"llm_{kind}_tokens", tokens)
+    
+    def _handle_response(self, model: str, status_code: int, body: str, latency: float, match: KeywordMatch) -> Optional[Dict[str, Any]]:
+        """Record the outcome of one model attempt; returns the result on success, RATE_LIMITED on a 429"""
+        if status_code != 200:
+            self._record_call(model, str(status_code), latency)
+        if status_code == 429:
+            # The scheduler holds this model until its quota recovers; its health is unaffected
+            model_router.release(model)
+            return RATE_LIMITED
+        if status_code == 200:
+            model_router.record_success(model, latency)
+            logger.info(f"Successfully used model: {model}")
+            data = json.loads(body)
+            self._record_call(model, "200", latency, data.get("usage"))
+            return self._build_result(match, data["choices"][0]["message"]["content"])
+        
+        model_router.record_failure(model, latency, status_code, body)
+        logger.warning(f"Model {model} failed: {status_code}")
+        return None
+    
+    def _cache_lookup(self, user_message: str, match: KeywordMatch, customer_context: Dict[str, Any] = None,
+                      conversation_history: List[Dict] = None):
+        """Returns (cache_key, cached_result); the key is None when caching is bypassed"""
+        cache_key = response_cache.make_key(user_message, match.intent, customer_context, conversation_history)
+        if cache_key is None:
+            return None, None
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            cached["requires_human"] = self._requires_human(cached["intent"], match)
+            logger.info(f"Answered from response cache ({cached['cached']} match)")
+        return cache_key, cached
+    
+    async def _attempt(self, client: httpx.AsyncClient, model: str, messages: List[Dict], match: KeywordMatch,
+                       deadline: float, priority: int = PRIORITY_NORMAL) -> Optional[Dict[str, Any]]:
+        """One async model attempt: waits for a scheduler slot, bounded by the generation deadline"""
+        started = time.monotonic()
+        try:
+            async with llm_scheduler.slot(model, self._estimate_request_tokens(messages), priority, deadline - started):
+                count("llm_queue_ms", (time.monotonic() - started) * 1000)
+                remaining = deadline - time.monotonic()
+                started = time.monotonic()  # queueing time is not model latency
+                response = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self._headers(),
+                    json=self._build_payload(model, messages),
+                    timeout=httpx.Timeout(min(settings.GROQ_TIMEOUT, remaining), connect=settings.GROQ_CONNECT_TIMEOUT)
+                )
+                llm_scheduler.observe(model, response.status_code, response.headers)
+                count("llm_ms", (time.monotonic() - started) * 1000)
+            return self._handle_response(model, response.status_code, response.text, time.monotonic() - started, match)
+        except SchedulerTimeout as e:
+            model_router.release(model)
+            logger.warning(str(e))
+            return None
+        except asyncio.CancelledError:
+            # Lost a hedge race - no verdict on this model
+            model_router.release(model)
+            raise
+        except Exception as e:
+            model_router.record_failure(model, time.monotonic() - started)
+            self._record_call(model, "error", time.monotonic() - started)
+            logger.warning(f"Model {model} error: {e}")
+            return None
     
-    def generate_response(self, user_message: str, customer_context: Dict[str, Any] = None, conversation_history: List[Dict] = None) -> Dict[str, Any]:
+    async def agenerate_response(self, user_message: str, customer_context: Dict[str, Any] = None, conversation_history: List[Dict] = None,
+                                 priority: int = PRIORITY_NORMAL, match: Optional[KeywordMatch] = None) -> Dict[str, Any]:
         """
-        Generate AI response using Groq API (free & fast!) - SYNC VERSION
+        Generate AI response using Groq API - ASYNC VERSION (does not block the event loop)
         """
-        # Try different models in case one is deprecated
-        models_to_try = [
-            "llama-3.1-8b-instant",  # Primary model
-            "llama3-8b-8192",        # Fallback (in case it works for some)
-            "mixtral-8x7b-32768"     # Alternative model
-        ]
+        match = match or keyword_matcher.analyze(user_message)
+        cache_key, cached = self._cache_lookup(user_message, match, customer_context, conversation_history)
+        if cached is not None:
+            return cached
         
-        for model in models_to_try:
-            try:
-                # Build the context-aware prompt
-                system_prompt = self._build_system_prompt(customer_context)
-                
-                # Prepare messages
-                messages = [{"role": "system", "content": system_prompt}]
-                
-                # Add conversation history if available
-                if conversation_history:
-                    messages.extend(conversation_history[-6:])
-                
-                # Add current user message
-                messages.append({"role": "user", "content": user_message})
+        result = await self._agenerate_uncached(user_message, match, customer_context, conversation_history, priority)
+        if cache_key is not None:
+            response_cache.put(cache_key, result, customer_context)
+        return result
+    
+    async def _agenerate_uncached(self, user_message: str, match: KeywordMatch, customer_context: Dict[str, Any] = None,
+                                  conversation_history: List[Dict] = None, priority: int = PRIORITY_NORMAL) -> Dict[str, Any]:
+        """
+        Models are tried fastest-healthy first; with MODEL_HEDGE_AFTER_MS set, a second
+        model is started if the first hasn't answered in time and the first answer wins.
+        A rate-limited model goes back in the queue and runs again once its quota allows.
+        """
+        messages = self._build_messages(user_message, customer_context, conversation_history)
+        client = self._get_async_client()
+        deadline = time.monotonic() + settings.GROQ_GENERATION_DEADLINE
+        hedge_after = settings.MODEL_HEDGE_AFTER_MS / 1000
+        queue = model_router.candidates()
+        pending = set()
+        attempts: Dict[asyncio.Future, str] = {}
+        retries: Dict[str, int] = {}
+        
+        def start_next() -> bool:
+            while queue:
+                model = queue.pop(0)
+                if model_router.acquire(model):
+                    task = asyncio.ensure_future(self._attempt(client, model, messages, match, deadline, priority))
+                    attempts[task] = model
+                    pending.add(task)
+                    return True
+            return False
+        
+        try:
+            start_next()
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Generation deadline exceeded")
+                    break
+                wait_for = min(hedge_after, remaining) if hedge_after > 0 and queue and len(pending) < 2 else remaining
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
                 
-                # Call Groq API - SYNC version
-                response = requests.post(
-                    f"{self.base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.groq_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": model,
-                        "messages": messages,
-                        "temperature": 0.7,
-                        "max_tokens": 500
-                    },
-                    timeout=30.0
-                )
+                if not done:
+                    # Primary is slow - hedge with the next model
+                    if not start_next() and deadline - time.monotonic() <= 0:
+                        break
+                    continue
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_response = data["choices"][0]["message"]["content"]
-                    
-                    # Analyze intent
-                    intent = self._analyze_intent(user_message, ai_response)
-                    
-                    logger.info(f"Successfully used model: {model}")
-                    return {
-                        "response": ai_response,
-                        "intent": intent,
-                        "requires_human": self._should_escalate_to_human(intent, user_message),
-                        "confidence": 0.9
-                    }
-                else:
-                    logger.warning(f"Model {model} failed: {response.status_code}")
-                    continue  # Try next model
+                for task in done:
+                    result = task.result()
+                    if result is RATE_LIMITED:
+                        model = attempts[task]
+                        if retries.get(model, 0) < settings.LLM_RATE_LIMIT_RETRIES:
+                            retries[model] = retries.get(model, 0) + 1
+                            queue.append(model)
+                    elif result is not None:
+                        return result
                 
-            except Exception as e:
-                logger.warning(f"Model {model} error: {e}")
-                continue  # Try next model
+                if not pending:
+                    start_next()  # Try next model
+        finally:
+            for task in pending:
+                task.cancel()
         
         # If all models fail, use fallback
         logger.error("All AI models failed, using fallback response")
         return self._get_fallback_response()
     
-    def _build_system_prompt(self, customer_context: Dict[str, Any] = None) -> str:
-        """Build the system prompt with business context"""
+    async def astream_response(self, user_message: str, customer_context: Dict[str, Any] = None, conversation_history: List[Dict] = None,
+                               priority: int = PRIORITY_NORMAL, match: Optional[KeywordMatch] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream an AI response as it is generated.
         
-        base_prompt = """You are a friendly and helpful customer service agent for an e-commerce store. 
-Your goal is to assist customers with their inquiries in a professional, empathetic manner.
-
-KEY RESPONSE GUIDELINES:
-1. Be warm, friendly, and professional
-2. If you don't have specific order data, guide customers on how to find it
-3. For order status inquiries, ask for order number or email
-4. For product questions, be helpful but suggest checking the website for latest inventory
-5. Escalate to human agent for complex returns, complaints, or technical issues
-6. Always maintain brand voice - helpful, efficient, and caring
-
-COMMON SCENARIOS:
-- Order Status: "I'd be happy to check your order status! Do you have your order number or the email used for purchase?"
-- Product Info: "I can help with general product information! For specific inventory and pricing, our website has the most up-to-date details."
-- Shipping: "For shipping questions, I'll need your order number to look up the latest tracking information."
-- Returns: "For returns and exchanges, I'll connect you with our specialist team who can process this for you."
-- General Help: "I'm here to help! What can I assist you with today?"
-
-Always be honest about what information you have access to. If you need specific data from our systems, let the customer know what information you need to help them."""
-
-        if customer_context:
-            context_section = "\n\nCUSTOMER CONTEXT:\n"
-            if customer_context.get('recent_orders'):
-                context_section += f"- Recent orders: {len(customer_context['recent_orders'])} orders\n"
-            if customer_context.get('customer_name'):
-                context_section += f"- Customer name: {customer_context['customer_name']}\n"
-            base_prompt += context_section
-
-        return base_prompt
-    
-    def _analyze_intent(self, user_message: str, ai_response: str) -> str:
-        """Analyze the intent of the user message"""
-        message_lower = user_message.lower()
+        Yields {"delta": text} for each chunk and finally {"result": ...} with the same
+        shape agenerate_response returns. Models are only switched before the first chunk.
+        """
+        match = match or keyword_matcher.analyze(user_message)
+        cache_key, cached = self._cache_lookup(user_message, match, customer_context, conversation_history)
+        if cached is not None:
+            yield {"delta": cached["response"]}
+            yield {"result": cached}
+            return
         
-        intents = {
-            'order_status': ['order status', 'where is my order', 'tracking', 'when will it arrive', 'order number'],
-            'product_info': ['product', 'in stock', 'available', 'price', 'size', 'color'],
-            'shipping': ['shipping', 'delivery', 'ship', 'arrive'],
-            'returns': ['return', 'exchange', 'refund', 'send back'],
-            'general_help': ['help', 'hello', 'hi', 'support', 'question']
-        }
+        async for event in self._astream_uncached(user_message, match, customer_context, conversation_history, priority):
+            if "result" in event and cache_key is not None:
+                response_cache.put(cache_key, event["result"], customer_context)
+            yield event
+    
+    async def _astream_uncached(self, user_message: str, match: KeywordMatch, customer_context: Dict[str, Any] = None,
+                                conversation_history: List[Dict] = None, priority: int = PRIORITY_NORMAL) -> AsyncIterator[Dict[str, Any]]:
+        messages = self._build_messages(user_message, customer_context, conversation_history)
+        client = self._get_async_client()
+        deadline = time.monotonic() + settings.GROQ_GENERATION_DEADLINE
+        queue = model_router.candidates()
+        retries: Dict[str, int] = {}
         
-        for intent, keywords in intents.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return intent
+        while queue:
+            model = queue.pop(0)
+            if deadline - time.monotonic() <= 0:
+                logger.warning("Generation deadline exceeded")
+                break
+            if not model_router.acquire(model):
+                continue
+            
+            started = time.monotonic()
+            chunks = []
+            usage = None
+            try:
+                # The slot is held for the whole stream
+                async with llm_scheduler.slot(model, self._estimate_request_tokens(messages), priority, deadline - started):
+                    count("llm_queue_ms", (time.monotonic() - started) * 1000)
+                    remaining = deadline - time.monotonic()
+                    started = time.monotonic()
+                    async with client.stream(
+                        "POST",
+                        f"{self.base_url}/chat/completions",
+                        headers=self._headers(),
+                        json={**self._build_payload(model, messages), "stream": True},
+                        timeout=httpx.Timeout(min(settings.GROQ_TIMEOUT, remaining), connect=settings.GROQ_CONNECT_TIMEOUT)
+                    ) as response:
+                        llm_scheduler.observe(model, response.status_code, response.headers)
+                        if response.status_code != 200:
+                            body = (await response.aread()).decode(errors="replace")
+                            result = self._handle_response(model, response.status_code, body, time.monotonic() - started, match)
+                            if result is RATE_LIMITED and retries.get(model, 0) < settings.LLM_RATE_LIMIT_RETRIES:
+                                retries[model] = retries.get(model, 0) + 1
+                                queue.append(model)  # again once its quota recovers
+                            continue  # Try next model
+                        
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                break
+                            payload = json.loads(data)
+                            # Groq reports usage on the last chunk (x_groq.usage); OpenAI-style servers use "usage"
+                            usage = payload.get("usage") or payload.get("x_groq", {}).get("usage") or usage
+                            delta = payload["choices"][0].get("delta", {}).get("content") if payload.get("choices") else None
+                            if delta:
+                                chunks.append(delta)
+                                yield {"delta": delta}
+            except SchedulerTimeout as e:
+                model_router.release(model)
+                logger.warning(str(e))
+                continue
+            except (asyncio.CancelledError, GeneratorExit):
+                # Client went away - no verdict on this model
+                model_router.release(model)
+                raise
+            except Exception as e:
+                model_router.record_failure(model, time.monotonic() - started)
+                self._record_call(model, "error", time.monotonic() - started)
+                logger.warning(f"Model {model} stream error: {e}")
+                if not chunks:
+                    continue  # Nothing sent yet, try next model
+                # Already streamed part of an answer - finish with what we have
+                yield {"result": self._build_result(match, "".join(chunks))}
+                return
+            
+            model_router.record_success(model, time.monotonic() - started)
+            count("llm_ms", (time.monotonic() - started) * 1000)
+            self._record_call(model, "200", time.monotonic() - started, usage)
+            logger.info(f"Successfully streamed model: {model}")
+            yield {"result": self._build_result(match, "".join(chunks))}
+            return
         
-        return 'general_help'
+        # If all models fail, use fallback
+        logger.error("All AI models failed, using fallback response")
+        fallback = self._get_fallback_response()
+        yield {"delta": fallback["response"]}
+        yield {"result": fallback}
     
-    def _should_escalate_to_human(self, intent: str, user_message: str) -> bool:
+    def _requires_human(self, intent: str, match: KeywordMatch) -> bool:
         """Determine if conversation should be escalated to human agent"""
-        escalation_keywords = [
-            'manager', 'supervisor', 'complaint', 'angry', 'furious', 
-            'terrible', 'awful', 'horrible', 'cancel my account', 'legal'
-        ]
-        
-        message_lower = user_message.lower()
-        
-        if intent in ['returns']:
+        if intent in keyword_matcher.escalation_intents:
             return True
         
-        if any(keyword in message_lower for keyword in escalation_keywords):
-            return True
-            
-        return False
+        return bool(match.escalation_keywords)
     
     def _get_fallback_response(self) -> Dict[str, Any]:
         """Return a fallback response when AI service fails"""
@@ -1,37 +1,332 @@
+import asyncio
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models.database import Conversation, Customer
+from app.models.database import Conversation, Customer, CustomerStats, secure_session
 from app.services.ai_service import ai_service
+from app.services.fast_path import fast_path_router
+from app.services.keyword_matcher import keyword_matcher, KeywordMatch
+from app.services.message_coalescer import message_coalescer
+from app.services.llm_scheduler import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from app.services.history_cache import history_cache
+from app.services.customer_cache import customer_cache
+from app.services.customer_stats import get_customer_stats, get_customer_stats_many
+from app.services.conversation_summary import get_summary, get_summaries
+from app.services.conversation_writer import conversation_writer, persist_conversations
+from app.services.order_lookup import order_service
+from app.utils.instrumentation import span
+from app.utils.lazy_context import LazyContext
+from app.utils.pii_cache import pii_cache
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
 class ConversationManager:
     def __init__(self, db: Session):
         self.db = db
     
-    def process_message(self, user_message: str, social_media_id: str, platform: str = "instagram") -> Dict[str, Any]:
-        """Process incoming message and generate AI response"""
+    async def aprocess_message(self, user_message: str, social_media_id: str, platform: str = "instagram",
+                               priority: Optional[int] = None) -> Dict[str, Any]:
+        """Process an incoming message and generate the AI response.
         
-        # Find or create customer
-        customer = self._get_or_create_customer(social_media_id, platform)
+        priority overrides the LLM scheduler lane (e.g. PRIORITY_LOW for simulated traffic).
+        """
+        # One keyword pass serves routing, orders, priority, the cache and the final result
+        match = keyword_matcher.analyze(user_message)
+        fast_result = self._route_fast_path(user_message, match)
+        if fast_result is not None:
+            customer = self._get_or_create_customer(social_media_id, platform)
+            return self._complete_message(customer.id, platform, user_message, fast_result)
         
-        # Get conversation history
-        conversation_history = self._get_conversation_history(customer.id)
+        customer, conversation_history, customer_context = self._prepare_message(social_media_id, platform, user_message, match)
+        customer_id = customer.id
+        order_result = self._route_order_answer(user_message, customer_context)
+        if order_result is not None:
+            return self._complete_message(customer_id, platform, user_message, order_result)
         
-        # Get customer context (will be enhanced with POS data later)
-        customer_context = self._get_customer_context(customer)
+        # End the transaction (keeping refreshed order cache rows) so the pooled connection
+        # isn't held across the LLM call
+        self.db.commit()
         
         # Generate AI response
-        ai_result = ai_service.generate_response(
+        ai_result = await ai_service.agenerate_response(
             user_message=user_message,
             customer_context=customer_context,
-            conversation_history=conversation_history
+            conversation_history=conversation_history,
+            priority=self._priority(match, customer_context) if priority is None else priority,
+            match=match
         )
         
+        return self._complete_message(customer_id, platform, user_message, ai_result)
+    
+    async def astream_message(self, user_message: str, social_media_id: str, platform: str = "instagram") -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of aprocess_message.
+        
+        Yields {"delta": text} chunks, then {"done": result} once the conversation has
+        been saved - intent detection and persistence run on the completed answer.
+        """
+        # One keyword pass serves routing, orders, priority, the cache and the final result
+        match = keyword_matcher.analyze(user_message)
+        fast_result = self._route_fast_path(user_message, match)
+        if fast_result is not None:
+            customer = self._get_or_create_customer(social_media_id, platform)
+            yield {"delta": fast_result["response"]}
+            yield {"done": self._complete_message(customer.id, platform, user_message, fast_result)}
+            return
+        
+        customer, conversation_history, customer_context = self._prepare_message(social_media_id, platform, user_message, match)
+        customer_id = customer.id
+        order_result = self._route_order_answer(user_message, customer_context)
+        if order_result is not None:
+            yield {"delta": order_result["response"]}
+            yield {"done": self._complete_message(customer_id, platform, user_message, order_result)}
+            return
+        
+        # End the transaction (keeping refreshed order cache rows) so the pooled connection
+        # isn't held while streaming
+        self.db.commit()
+        
+        async for event in ai_service.astream_response(
+            user_message=user_message,
+            customer_context=customer_context,
+            conversation_history=conversation_history,
+            priority=self._priority(match, customer_context),
+            match=match
+        ):
+            if "delta" in event:
+                yield event
+            else:
+                yield {"done": self._complete_message(customer_id, platform, user_message, event["result"])}
+    
+    async def aprocess_burst(self, messages: List[str], social_media_id: str, platform: str = "instagram") -> Dict[str, Any]:
+        """Answer several back-to-back messages from one customer with a single generation"""
+        if len(messages) == 1:
+            return await self.aprocess_message(messages[0], social_media_id, platform)
+        
+        merged = "\n".join(messages)
+        match = keyword_matcher.analyze(merged)
+        ai_result = self._route_fast_path(merged, match)
+        if ai_result is not None:
+            customer_id = self._get_or_create_customer(social_media_id, platform).id
+        else:
+            customer, conversation_history, customer_context = self._prepare_message(social_media_id, platform, merged, match)
+            customer_id = customer.id
+            self.db.commit()
+            ai_result = self._route_order_answer(merged, customer_context) or await ai_service.agenerate_response(
+                user_message=merged,
+                customer_context=customer_context,
+                conversation_history=conversation_history,
+                priority=self._priority(match, customer_context),
+                match=match
+            )
+        
+        # Every message is recorded; the reply is attached to the last one of the burst
+        records = [
+            self._record(customer_id, platform, message, "", keyword_matcher.analyze(message).intent, False)
+            for message in messages[:-1]
+        ]
+        records.append(self._record(customer_id, platform, messages[-1], ai_result["response"],
+                                    ai_result["intent"], ai_result["requires_human"]))
+        self._save_records(records)
+        return self._message_result(customer_id, ai_result)
+    
+    async def aprocess_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Answer many inbound messages at once (inbox sync).
+        
+        Customers, histories and context are resolved with set-based queries. Generation
+        fans out under a concurrency cap, with each customer's messages answered in order,
+        and all results are saved in one transaction. Returns one result per item, in order.
+        """
+        keys = list(dict.fromkeys((item["platform"], item["social_media_id"]) for item in items))
+        with span("customer"):
+            customers = self._get_or_create_customers(keys)
+        customer_ids = {key: customer.id for key, customer in customers.items()}
+        with span("history"):
+            histories = self._get_conversation_histories(list(customer_ids.values()))
+        with span("context"):
+            stats = get_customer_stats_many(self.db, list(customer_ids.values()))
+            summaries = get_summaries(self.db, list(customer_ids.values()))
+            contexts = {
+                key: self._build_customer_context(customer, stats.get(customer.id), summaries.get(customer.id))
+                for key, customer in customers.items()
+            }
+        item_orders: Optional[List[Dict[str, Any]]] = None
+        if settings.ORDER_LOOKUP_ENABLED:
+            with span("orders"):
+                item_orders = order_service.orders_for_messages(self.db, [
+                    (item["message"], customers[(item["platform"], item["social_media_id"])].email_bidx)
+                    for item in items
+                ])
+        
+        # End the transaction (keeping refreshed order cache rows) so no pooled connection is held across the LLM calls
+        self.db.commit()
+        
+        indexes_by_customer: Dict[Tuple[str, str], List[int]] = {}
+        for index, item in enumerate(items):
+            indexes_by_customer.setdefault((item["platform"], item["social_media_id"]), []).append(index)
+        
+        ai_results: List[Any] = [None] * len(items)
+        semaphore = asyncio.Semaphore(settings.CHAT_BATCH_CONCURRENCY)
+        
+        async def answer_customer(key: Tuple[str, str], indexes: List[int]):
+            history = list(histories.get(customer_ids[key], []))
+            for index in indexes:
+                user_message = items[index]["message"]
+                try:
+                    match = keyword_matcher.analyze(user_message)
+                    ai_result = self._route_fast_path(user_message, match)
+                    if ai_result is None and item_orders is not None:
+                        # A customer's items run one at a time, so its shared context can carry this item's orders
+                        contexts[key].pop("order_answer", None)
+                        self._apply_orders(contexts[key], item_orders[index], user_message, match)
+                        ai_result = self._route_order_answer(user_message, contexts[key])
+                    if ai_result is None:
+                        async with semaphore:
+                            ai_result = await ai_service.agenerate_response(
+                                user_message=user_message,
+                                customer_context=contexts[key],
+                                conversation_history=history,
+                                priority=PRIORITY_LOW,  # bulk sync yields to live chats
+                                match=match
+                            )
+                except Exception as e:
+                    logger.error(f"Batch item {index} failed: {e}")
+                    ai_results[index] = e
+                    continue
+                ai_results[index] = ai_result
+                # Later messages from the same customer see this exchange
+                history.append({"role": "user", "content": user_message})
+                history.append({"role": "assistant", "content": ai_result["response"]})
+        
+        await asyncio.gather(*(answer_customer(key, indexes) for key, indexes in indexes_by_customer.items()))
+        
+        return self._complete_batch(items, customer_ids, ai_results)
+    
+    def _complete_batch(self, items: List[Dict[str, Any]], customer_ids: Dict[Tuple[str, str], int],
+                        ai_results: List[Any]) -> List[Dict[str, Any]]:
+        """Save every answered item in one transaction and build the per-item results"""
+        records = []
+        for item, ai_result in zip(items, ai_results):
+            if isinstance(ai_result, dict):
+                records.append({
+                    "customer_id": customer_ids[(item["platform"], item["social_media_id"])],
+                    "platform": item["platform"],
+                    "user_message": item["message"],
+                    "ai_response": ai_result["response"],
+                    "intent": ai_result["intent"],
+                    "requires_human": ai_result["requires_human"]
+                })
+        
+        saved = True
+        if records:
+            try:
+                with span("commit"):
+                    persist_conversations(self.db, records)
+                    self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                saved = False
+                logger.error(f"Batch save of {len(records)} conversations failed: {e}")
+            else:
+                if settings.HISTORY_CACHE_ENABLED:
+                    for record in records:
+                        history_cache.append(record["customer_id"], record["user_message"], record["ai_response"])
+                logger.info(f"Saved {len(records)} batch conversations for {len(set(customer_ids.values()))} customers")
+        
+        results = []
+        for index, (item, ai_result) in enumerate(zip(items, ai_results)):
+            if not isinstance(ai_result, dict):
+                results.append({"index": index, "success": False, "error": str(ai_result)})
+            elif not saved:
+                results.append({"index": index, "success": False, "error": "Conversation could not be saved"})
+            else:
+                customer_id = customer_ids[(item["platform"], item["social_media_id"])]
+                results.append({"index": index, "success": True, **self._message_result(customer_id, ai_result)})
+        return results
+    
+    def _priority(self, match: KeywordMatch, customer_context: Dict[str, Any]) -> int:
+        """Escalations and returning customers jump the LLM queue"""
+        if match.requires_human:
+            return PRIORITY_HIGH
+        if customer_context and customer_context.get("conversation_count"):
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+    
+    def _route_fast_path(self, user_message: str, match: KeywordMatch) -> Optional[Dict[str, Any]]:
+        """Answer from the local FAQ table when confident - skips the LLM entirely"""
+        if not settings.FAST_PATH_ENABLED:
+            return None
+        
+        fast_result = fast_path_router.route(user_message)
+        if fast_result is not None:
+            # Routed answers still go through the escalation check
+            fast_result["requires_human"] = ai_service._requires_human(fast_result["intent"], match)
+            logger.info(f"Fast path answered with {fast_result['answer_id']} ({fast_result['answer_version']})")
+        return fast_result
+    
+    def _route_order_answer(self, user_message: str, customer_context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Answer an order-status question straight from the order lookup - no LLM call"""
+        response = customer_context.get("order_answer")
+        if response is None:
+            return None
+        logger.info("Order lookup answered the message directly")
+        return {
+            "response": response,
+            "intent": "order_status",
+            "requires_human": False,  # escalations never get a direct answer
+            "confidence": 1.0,
+            "source": "order_lookup"
+        }
+    
+    def _prepare_message(self, social_media_id: str, platform: str, user_message: str, match: KeywordMatch):
+        """Resolve the customer, history and context needed for a generation"""
+        # Find or create customer
+        with span("customer"):
+            customer = self._get_or_create_customer(social_media_id, platform)
+        
+        # Get conversation history
+        with span("history"):
+            conversation_history = self._get_conversation_history(customer.id)
+        
+        # Get customer context (will be enhanced with POS data later)
+        with span("context"):
+            customer_context = self._get_customer_context(customer)
+        
+        if settings.ORDER_LOOKUP_ENABLED:
+            with span("orders"):
+                self._attach_orders(customer_context, customer.email_bidx, user_message, match)
+        
+        return customer, conversation_history, customer_context
+    
+    def _attach_orders(self, customer_context: Dict[str, Any], email_bidx: Optional[str], user_message: str,
+                       match: KeywordMatch):
+        """Order summaries for the prompt, plus a ready answer for plain order-status questions"""
+        orders = order_service.orders_for_message(self.db, user_message, email_bidx)
+        self._apply_orders(customer_context, orders, user_message, match)
+    
+    def _apply_orders(self, customer_context: Dict[str, Any], orders: List[Dict[str, Any]], user_message: str,
+                      match: KeywordMatch):
+        """Put looked-up orders into the context, answering plain status questions directly"""
+        customer_context["recent_orders"] = order_service.context_summaries(orders)
+        if (settings.ORDER_DIRECT_ANSWERS
+                and match.intent in ("order_status", "shipping")
+                and not match.escalation_keywords
+                and order_service.is_status_question(user_message)):
+            answer = order_service.answer(orders)
+            if answer is not None:
+                customer_context["order_answer"] = answer
+    
+    def _complete_message(self, customer_id: int, platform: str, user_message: str, ai_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist the exchange and build the endpoint result"""
         # Save conversation to database
         self._save_conversation(
-            customer_id=customer.id,
+            customer_id=customer_id,
             platform=platform,
             user_message=user_message,
             ai_response=ai_result["response"],
@@ -39,20 +334,24 @@ class ConversationManager:
             requires_human=ai_result["requires_human"]
         )
         
+        return self._message_result(customer_id, ai_result)
+    
+    def _message_result(self, customer_id: int, ai_result: Dict[str, Any]) -> Dict[str, Any]:
         return {
             "response": ai_result["response"],
             "intent": ai_result["intent"],
             "requires_human": ai_result["requires_human"],
-            "customer_id": customer.id,
+            "customer_id": customer_id,
             "suggested_actions": self._get_suggested_actions(ai_result["intent"])
         }
     
     def _get_or_create_customer(self, social_media_id: str, platform: str) -> Customer:
         """Find existing customer or create new one"""
-        customer = self.db.query(Customer).filter(
-            Customer.social_media_id == social_media_id,
-            Customer.platform == platform
-        ).first()
+        cached = customer_cache.get(platform, social_media_id)
+        if cached is not None:
+            return self.db.merge(cached, load=False)
+        
+        customer = self._find_customer(social_media_id, platform)
         
         if not customer:
             customer = Customer()
@@ -61,52 +360,184 @@ class ConversationManager:
             customer.first_name = "Social"
             customer.last_name = "User"
             
-            self.db.add(customer)
-            self.db.commit()
-            self.db.refresh(customer)
-            logger.info(f"Created new customer: {customer.id}")
+            try:
+                self.db.add(customer)
+                self.db.flush()  # assigns the id while the columns are still loaded
+                snapshot = customer_cache.put(customer)
+                self.db.commit()
+                logger.info(f"Created new customer: {snapshot.id}")
+                # Re-attach the loaded snapshot instead of refreshing the expired instance
+                return self.db.merge(snapshot, load=False)
+            except IntegrityError:
+                # A concurrent request created the same customer first - use that row
+                self.db.rollback()
+                customer_cache.invalidate(platform, social_media_id)
+                customer = self._find_customer(social_media_id, platform)
         
+        customer_cache.put(customer)
         return customer
     
+    def _find_customer(self, social_media_id: str, platform: str):
+        return self.db.query(Customer).filter(
+            Customer.platform == platform,
+            Customer.social_media_id == social_media_id
+        ).first()
+    
+    def _get_or_create_customers(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Customer]:
+        """Set-based _get_or_create_customer for (platform, social_media_id) keys"""
+        snapshots = {}
+        for key in keys:
+            cached = customer_cache.get(*key)
+            if cached is not None:
+                snapshots[key] = cached
+        
+        missing = [key for key in keys if key not in snapshots]
+        if missing:
+            for customer in self._find_customers(missing):
+                snapshots[(customer.platform, customer.social_media_id)] = customer_cache.put(customer)
+            new_keys = [key for key in missing if key not in snapshots]
+            
+            upsert = _UPSERT_DIALECTS.get(self.db.get_bind().dialect.name)
+            if new_keys and upsert is not None:
+                # One insert; rows created concurrently by other requests are left as they are
+                self.db.execute(
+                    upsert(Customer).on_conflict_do_nothing(index_elements=[Customer.platform, Customer.social_media_id]),
+                    [{"platform": platform, "social_media_id": social_media_id, "first_name": "Social", "last_name": "User"}
+                     for platform, social_media_id in new_keys]
+                )
+                self.db.commit()
+                for customer in self._find_customers(new_keys):
+                    snapshots[(customer.platform, customer.social_media_id)] = customer_cache.put(customer)
+                logger.info(f"Created {len(new_keys)} new customers")
+            elif new_keys:
+                for platform, social_media_id in new_keys:
+                    snapshots[(platform, social_media_id)] = customer_cache.put(
+                        self._get_or_create_customer(social_media_id, platform)
+                    )
+        
+        # Loaded snapshots re-attach without a round trip, even after the commit above
+        return {key: self.db.merge(snapshots[key], load=False) for key in keys}
+    
+    def _find_customers(self, keys: List[Tuple[str, str]]) -> List[Customer]:
+        return self.db.query(Customer).filter(
+            tuple_(Customer.platform, Customer.social_media_id).in_(keys)
+        ).all()
+    
     def _get_conversation_history(self, customer_id: int) -> List[Dict]:
         """Get recent conversation history for context"""
-        conversations = self.db.query(Conversation).filter(
-            Conversation.customer_id == customer_id
-        ).order_by(Conversation.created_at.desc()).limit(10).all()
+        turns = history_cache.get(customer_id) if settings.HISTORY_CACHE_ENABLED else None
         
-        history = []
-        for conv in reversed(conversations):  # Oldest first
-            history.append({"role": "user", "content": conv.message_text})
-            history.append({"role": "assistant", "content": conv.ai_response})
+        if turns is None:
+            # Cold miss - load the window from the database
+            rows = self.db.query(Conversation.message_text, Conversation.ai_response).filter(
+                Conversation.customer_id == customer_id
+            ).order_by(Conversation.created_at.desc(), Conversation.id.desc()).limit(settings.HISTORY_WINDOW).all()
+            
+            turns = [(row.message_text, row.ai_response) for row in reversed(rows)]  # Oldest first
+            if settings.HISTORY_CACHE_ENABLED:
+                history_cache.load(customer_id, turns)
         
+        return self._turns_to_messages(turns)
+    
+    def _get_conversation_histories(self, customer_ids: List[int]) -> Dict[int, List[Dict]]:
+        """History for several customers; cache misses are loaded with one windowed query"""
+        turns_by_customer = {}
+        missing = []
+        for customer_id in customer_ids:
+            turns = history_cache.get(customer_id) if settings.HISTORY_CACHE_ENABLED else None
+            if turns is None:
+                missing.append(customer_id)
+            else:
+                turns_by_customer[customer_id] = turns
+        
+        if missing:
+            ranked = select(
+                Conversation.customer_id,
+                Conversation.message_text,
+                Conversation.ai_response,
+                func.row_number().over(
+                    partition_by=Conversation.customer_id,
+                    order_by=(Conversation.created_at.desc(), Conversation.id.desc())
+                ).label("position")
+            ).where(Conversation.customer_id.in_(missing)).subquery()
+            rows = self.db.execute(
+                select(ranked.c.customer_id, ranked.c.message_text, ranked.c.ai_response)
+                .where(ranked.c.position <= settings.HISTORY_WINDOW)
+                .order_by(ranked.c.customer_id, ranked.c.position.desc())  # Oldest first
+            ).all()
+            
+            loaded = {customer_id: [] for customer_id in missing}
+            for row in rows:
+                loaded[row.customer_id].append((row.message_text, row.ai_response))
+            if settings.HISTORY_CACHE_ENABLED:
+                for customer_id, turns in loaded.items():
+                    history_cache.load(customer_id, turns)
+            turns_by_customer.update(loaded)
+        
+        return {customer_id: self._turns_to_messages(turns) for customer_id, turns in turns_by_customer.items()}
+    
+    @staticmethod
+    def _turns_to_messages(turns) -> List[Dict]:
+        history = []
+        pending = []
+        for user_message, ai_response in turns:
+            pending.append(user_message)
+            if not ai_response:
+                continue  # part of a coalesced burst - answered together with the next message
+            history.append({"role": "user", "content": "\n".join(pending)})
+            history.append({"role": "assistant", "content": ai_response})
+            pending = []
         return history
     
     def _get_customer_context(self, customer: Customer) -> Dict[str, Any]:
         """Get customer context for AI (will be enhanced with POS data later)"""
-        return {
+        return self._build_customer_context(
+            customer, get_customer_stats(self.db, customer.id), get_summary(self.db, customer.id)
+        )
+    
+    def _build_customer_context(self, customer: Customer, stats: Optional[CustomerStats],
+                                summary: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # Capture the ciphertext now: the customer may be expired by the time a consumer reads it
+        email_encrypted = customer.email_encrypted
+        return LazyContext({
             "customer_name": f"{customer.first_name} {customer.last_name}".strip(),
-            "customer_email": customer.get_email(),
-            "recent_orders": [],  # Will be populated from POS later
-            "conversation_count": self.db.query(Conversation).filter(
-                Conversation.customer_id == customer.id
-            ).count()
-        }
+            "recent_orders": [],  # Filled from the order lookup in _prepare_message
+            "conversation_count": stats.message_count if stats else 0,
+            "conversation_summary": summary
+        }, lazy={
+            "customer_email": lambda: pii_cache.decrypt(email_encrypted)
+        })
     
     def _save_conversation(self, customer_id: int, platform: str, user_message: str, 
                           ai_response: str, intent: str, requires_human: bool):
         """Save conversation to database"""
-        conversation = Conversation(
-            customer_id=customer_id,
-            platform=platform,
-            message_text=user_message,
-            ai_response=ai_response,
-            intent=intent,
-            requires_human=requires_human
-        )
+        self._save_records([self._record(customer_id, platform, user_message, ai_response, intent, requires_human)])
+    
+    @staticmethod
+    def _record(customer_id: int, platform: str, user_message: str, ai_response: str,
+                intent: str, requires_human: bool) -> Dict[str, Any]:
+        return {
+            "customer_id": customer_id,
+            "platform": platform,
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "intent": intent,
+            "requires_human": requires_human
+        }
+    
+    def _save_records(self, records: List[Dict[str, Any]]):
+        # Write-behind mode queues the records; a full queue falls back to writing here
+        unqueued = [record for record in records
+                    if not (settings.WRITE_BEHIND_ENABLED and conversation_writer.submit(record))]
+        if unqueued:
+            with span("commit"):
+                persist_conversations(self.db, unqueued)
+                self.db.commit()
         
-        self.db.add(conversation)
-        self.db.commit()
-        logger.info(f"Saved conversation for customer {customer_id}, intent: {intent}")
+        for record in records:
+            if settings.HISTORY_CACHE_ENABLED:
+                history_cache.append(record["customer_id"], record["user_message"], record["ai_response"])
+            logger.info(f"Saved conversation for customer {record['customer_id']}, intent: {record['intent']}")
     
     def _get_suggested_actions(self, intent: str) -> List[str]:
         """Get suggested next actions based on intent"""
@@ -122,4 +553,16 @@ class ConversationManager:
 
 # Global conversation manager (will be initialized with database session)
 def get_conversation_manager(db: Session):
-    return ConversationManager(db)
\ No newline at end of file
+    return ConversationManager(db)
+
+async def acoalesce_message(user_message: str, social_media_id: str, platform: str = "instagram") -> Dict[str, Any]:
+    """Process a message through the per-customer burst coalescer"""
+    async def answer_burst(messages: List[str]) -> Dict[str, Any]:
+        # The burst outlives the request that opened it, so it uses its own session
+        db = secure_session.SessionLocal()
+        try:
+            return await ConversationManager(db).aprocess_burst(messages, social_media_id, platform)
+        finally:
+            db.close()
+    
+    return await message_coalescer.submit((platform, social_media_id), user_message, answer_burst)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import logging
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import select, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.database import ConversationSummary
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def make_note(message: str) -> str:
+    message = " ".join(message.split())
+    limit = settings.SUMMARY_NOTE_CHARS
+    return message if len(message) <= limit else message[:limit - 3].rstrip() + "..."
+
+def update_summaries(db: Session, records: List[Dict[str, Any]]):
+    """
+    Fold saved conversation records into each customer's rolling summary.
+
+    Incremental and local (no LLM call): intent counts plus the latest customer messages.
+    Runs inside the caller's transaction, like the stats counters. Missing rows are created
+    conflict-free first and then read under a row lock, so concurrent first saves for one
+    customer (other workers, the write-behind path) neither fail nor lose each other's updates.
+    """
+    by_customer: Dict[int, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_customer.setdefault(record["customer_id"], []).append(record)
+    if not by_customer:
+        return
+
+    _ensure_rows(db, list(by_customer))
+    summaries = db.scalars(
+        select(ConversationSummary)
+        .where(ConversationSummary.customer_id.in_(list(by_customer)))
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    for summary in summaries:
+        customer_records = by_customer[summary.customer_id]
+        intent_counts = dict(summary.intent_counts or {})
+        notes = list(summary.notes or [])
+        for record in customer_records:
+            intent = record.get("intent") or "general_help"
+            intent_counts[intent] = intent_counts.get(intent, 0) + 1
+            notes.append(make_note(record["user_message"]))
+        # New objects so the JSON columns are seen as changed
+        summary.intent_counts = intent_counts
+        summary.notes = notes[-settings.SUMMARY_MAX_NOTES:]
+        summary.turns = (summary.turns or 0) + len(customer_records)
+
+def _ensure_rows(db: Session, customer_ids: List[int]):
+    """Create empty summaries for customers that have none, ignoring ones created concurrently"""
+    upsert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        db.execute(
+            upsert(ConversationSummary).on_conflict_do_nothing(index_elements=[ConversationSummary.customer_id]),
+            [{"customer_id": customer_id, "turns": 0} for customer_id in customer_ids]
+        )
+        return
+
+    # Portable fallback: insert each missing row in a savepoint so a lost race only undoes that row
+    existing = set(db.scalars(select(ConversationSummary.customer_id).where(
+        ConversationSummary.customer_id.in_(customer_ids)
+    )))
+    for customer_id in customer_ids:
+        if customer_id in existing:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(ConversationSummary).values(customer_id=customer_id, turns=0))
+        except IntegrityError:
+            pass
+
+def _as_dict(summary: Optional[ConversationSummary]) -> Optional[Dict[str, Any]]:
+    if summary is None or not summary.turns:
+        return None
+    return {
+        "turns": summary.turns,
+        "intent_counts": dict(summary.intent_counts or {}),
+        "notes": list(summary.notes or [])
+    }
+
+def get_summary(db: Session, customer_id: int) -> Optional[Dict[str, Any]]:
+    """Plain-dict summary for prompt building (None for a customer with no history)"""
+    return _as_dict(db.get(ConversationSummary, customer_id))
+
+def get_summaries(db: Session, customer_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Summaries for several customers in one query (customers without history are absent)"""
+    if not customer_ids:
+        return {}
+    summaries = db.scalars(select(ConversationSummary).where(ConversationSummary.customer_id.in_(customer_ids)))
+    return {summary.customer_id: _as_dict(summary) for summary in summaries if summary.turns}
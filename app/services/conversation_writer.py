@@ -0,0 +1,164 @@
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Callable
+
+from sqlalchemy.orm import Session
+
+from app.models.database import Conversation, secure_session
+from app.services.customer_stats import record_conversations
+from app.services.conversation_summary import update_summaries
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FLUSH_RETRIES = 3
+
+def persist_conversations(db: Session, records: List[Dict[str, Any]]):
+    """Add conversation rows, counter and summary updates to the session (caller commits)"""
+    db.add_all([
+        Conversation(
+            customer_id=record["customer_id"],
+            platform=record["platform"],
+            message_text=record["user_message"],
+            ai_response=record["ai_response"],
+            intent=record["intent"],
+            requires_human=record["requires_human"]
+        )
+        for record in records
+    ])
+    record_conversations(db, records)
+    update_summaries(db, records)
+
+class ConversationWriter:
+    """
+    Optional write-behind persistence for conversations.
+
+    Records go onto a bounded queue and a background thread commits them in batches
+    (by size or time), so chat responses don't wait on disk. When the queue is full the
+    caller writes synchronously instead - that is the backpressure.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_queue: int, batch_size: int, flush_interval: float):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Write-behind persistence started (batch {self.batch_size}, {self.flush_interval * 1000:.0f}ms)")
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Queue a record; False means the caller must write it synchronously"""
+        if not self.running or self._stopping.is_set():
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def drain(self, timeout: float = 30.0):
+        """Stop accepting records and flush everything queued (called on shutdown)"""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Write-behind drain timed out with ~{self._queue.qsize()} records unwritten")
+            return
+        self._thread = None
+        
+        # Records that raced the stop flag are flushed here
+        leftovers = []
+        while True:
+            try:
+                leftovers.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftovers:
+            self._flush(leftovers)
+        logger.info(f"Write-behind drained: {self.written} records in {self.batches} batches")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.WRITE_BEHIND_ENABLED,
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "rejected_to_sync": self.rejected,
+            "failed": self.failed
+        }
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            elif self._stopping.is_set() and self._queue.empty():
+                return
+
+    def _collect(self) -> List[Dict[str, Any]]:
+        """Block for the first record, then gather more until the batch is full or the window closes"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            db = self.session_factory()
+            try:
+                persist_conversations(db, batch)
+                db.commit()
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Write-behind flush of {len(batch)} records failed (attempt {attempt}): {e}")
+                time.sleep(0.1 * attempt)
+            finally:
+                db.close()
+        self.failed += len(batch)
+        logger.error(f"Dropped {len(batch)} conversation records after {FLUSH_RETRIES} failed flushes")
+
+# Global write-behind writer (started from the app lifespan when enabled)
+conversation_writer = ConversationWriter(
+    session_factory=secure_session.SessionLocal,
+    max_queue=settings.WRITE_BEHIND_MAX_QUEUE,
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=settings.WRITE_BEHIND_FLUSH_MS / 1000
+)
@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.models.database import Customer
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns copied into the detached snapshot; created_at is left to lazy-load if ever read
+SNAPSHOT_COLUMNS = ("id", "social_media_id", "platform", "first_name", "last_name",
+                    "email_encrypted", "phone_encrypted", "email_bidx", "phone_bidx")
+
+class CustomerIdentityCache:
+    """
+    Process-local map of (platform, social_media_id) -> customer with a TTL.
+
+    Entries are detached Customer snapshots; callers attach them to their session with
+    ``session.merge(snapshot, load=False)`` which needs no database round trip.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Customer]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, platform: str, social_media_id: str) -> Optional[Customer]:
+        key = (platform, social_media_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, customer: Customer) -> Customer:
+        """Cache a snapshot of a customer whose columns are loaded; returns the snapshot"""
+        snapshot = Customer(**{column: getattr(customer, column) for column in SNAPSHOT_COLUMNS})
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            self._entries[(snapshot.platform, snapshot.social_media_id)] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end((snapshot.platform, snapshot.social_media_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, platform: Optional[str] = None, social_media_id: Optional[str] = None):
+        with self._lock:
+            if platform is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((platform, social_media_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+# Global customer identity cache instance
+customer_cache = CustomerIdentityCache(
+    ttl=settings.CUSTOMER_CACHE_TTL,
+    max_entries=settings.CUSTOMER_CACHE_MAX_ENTRIES
+)
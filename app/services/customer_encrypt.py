@@ -0,0 +1,20 @@
+from typing import Any, Dict, List
+
+# Process-pool workers import only this module, so it must stay free of app.models (engine and schema setup)
+from config.security import encryptor
+
+def encrypt_chunk(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Worker-side: turn parsed rows into customer column values (runs in the process pool)"""
+    return [
+        {
+            "social_media_id": row["social_media_id"],
+            "platform": row["platform"],
+            "email_encrypted": encryptor.encrypt(row["email"]) or None,
+            "phone_encrypted": encryptor.encrypt(row["phone"]) or None,
+            "email_bidx": encryptor.blind_index(row["email"], "email"),
+            "phone_bidx": encryptor.blind_index(row["phone"], "phone"),
+            "first_name": row["first_name"] or None,
+            "last_name": row["last_name"] or None
+        }
+        for row in rows
+    ]
@@ -0,0 +1,172 @@
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Callable
+
+from sqlalchemy import func, insert, select, update, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.database import Customer
+from app.services.customer_cache import customer_cache
+from app.services.customer_encrypt import encrypt_chunk
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("social_media_id", "platform", "email", "phone", "first_name", "last_name")
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def parse_rows(lines: Iterable[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    """Parse NDJSON or CSV lines into raw customer dicts"""
+    if fmt == "csv":
+        yield from csv.DictReader(lines)
+    elif fmt == "ndjson":
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+def validate_rows(lines: Iterable[str], fmt: str) -> int:
+    """
+    Parse the whole input without writing anything; returns the row count.
+
+    import_customers commits chunk by chunk, so callers with a re-readable input run this
+    first rather than leave a partial import behind. Raises ValueError naming the bad line.
+    """
+    consumed = 0
+
+    def counted() -> Iterator[str]:
+        nonlocal consumed
+        for line in lines:
+            consumed += 1
+            yield line
+
+    rows = 0
+    try:
+        for raw in parse_rows(counted(), fmt):
+            if not isinstance(raw, dict):
+                raise ValueError("expected a JSON object")
+            rows += 1
+    except (ValueError, csv.Error) as e:
+        # A line that fails to decode is never handed out, so it is the next one
+        line = consumed + 1 if isinstance(e, UnicodeDecodeError) else consumed
+        raise ValueError(f"line {line}: {e}") from e
+    return rows
+
+def _clean(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    row = {field: (str(raw.get(field) or "").strip()) for field in FIELDS}
+    if not row["social_media_id"]:
+        return None
+    row["platform"] = (row["platform"] or "instagram").lower()
+    return row
+
+def _chunks(rows: Iterator[Dict[str, Any]], size: int, counters: Dict[str, int]) -> Iterator[List[Dict[str, Any]]]:
+    chunk: Dict[tuple, Dict[str, Any]] = {}
+    for raw in rows:
+        row = _clean(raw)
+        if row is None:
+            counters["skipped"] += 1
+            continue
+        # Last row wins for duplicate keys inside a chunk (one upsert can't touch a row twice)
+        chunk[(row["platform"], row["social_media_id"])] = row
+        if len(chunk) >= size:
+            yield list(chunk.values())
+            chunk = {}
+    if chunk:
+        yield list(chunk.values())
+
+def _write_chunk(db: Session, values: List[Dict[str, Any]]):
+    """Insert-or-update one chunk in a single executemany-style statement"""
+    upsert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    updatable = [column for column in values[0] if column not in ("social_media_id", "platform")]
+
+    if upsert is not None:
+        statement = upsert(Customer)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[Customer.platform, Customer.social_media_id],
+                # Blank fields in the import keep what is already stored
+                set_={column: func.coalesce(statement.excluded[column], Customer.__table__.c[column])
+                      for column in updatable}
+            ),
+            values
+        )
+    else:
+        keys = [(value["platform"], value["social_media_id"]) for value in values]
+        existing = dict(
+            ((platform, social_media_id), customer_id)
+            for customer_id, platform, social_media_id in db.execute(
+                select(Customer.id, Customer.platform, Customer.social_media_id)
+                .where(tuple_(Customer.platform, Customer.social_media_id).in_(keys))
+            )
+        )
+        new_rows = [value for key, value in zip(keys, values) if key not in existing]
+        updates = [
+            {"id": existing[key], **{column: value[column] for column in updatable if value[column] is not None}}
+            for key, value in zip(keys, values) if key in existing
+        ]
+        if new_rows:
+            db.execute(insert(Customer), new_rows)
+        for row in updates:
+            if len(row) > 1:
+                db.execute(update(Customer).where(Customer.id == row.pop("id")).values(**row))
+    db.commit()
+
+    for value in values:
+        customer_cache.invalidate(value["platform"], value["social_media_id"])
+
+def import_customers(db: Session, lines: Iterable[str], fmt: str = "ndjson",
+                     chunk_size: Optional[int] = None, workers: Optional[int] = None,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Bulk import customers, upserting on (platform, social_media_id).
+
+    Rows are parsed in chunks; email/phone encryption for upcoming chunks runs across a
+    process pool while the current chunk is written, so CPU and DB work overlap.
+    """
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    workers = workers or settings.IMPORT_WORKERS or os.cpu_count() or 1
+    counters = {"rows": 0, "chunks": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    def report() -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return {
+            **counters,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(counters["rows"] / elapsed, 1) if elapsed else 0.0
+        }
+
+    def write_next():
+        values = in_flight.popleft().result()
+        _write_chunk(db, values)
+        counters["chunks"] += 1
+        counters["rows"] += len(values)
+        _progress(report(), progress)
+
+    # spawn keeps workers independent of the server's threads and open connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+        for chunk in _chunks(parse_rows(lines, fmt), chunk_size, counters):
+            in_flight.append(pool.submit(encrypt_chunk, chunk))
+            # Bounded read-ahead: never more than two chunks per worker held in memory
+            if len(in_flight) >= workers * 2:
+                write_next()
+        while in_flight:
+            write_next()
+
+    result = report()
+    logger.info(f"Customer import finished: {result}")
+    return result
+
+def _progress(state: Dict[str, Any], progress: Optional[Callable[[Dict[str, Any]], None]]):
+    logger.info(f"Imported {state['rows']} customers ({state['rows_per_sec']} rows/sec)")
+    if progress is not None:
+        progress(state)
@@ -0,0 +1,81 @@
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from cryptography.fernet import InvalidToken
+from sqlalchemy import select, update, or_
+from sqlalchemy.orm import Session
+
+from app.models.database import Customer
+from config.security import encryptor
+
+logger = logging.getLogger(__name__)
+
+def find_customers(db: Session, email: Optional[str] = None, phone: Optional[str] = None,
+                   platform: Optional[str] = None) -> List[Customer]:
+    """
+    Find customers by email and/or phone through their blind indexes.
+
+    An index probe on the HMAC column - no rows are decrypted. Both given means both must match.
+    A value that normalizes to nothing (e.g. phone "n/a") matches no one, never the customers
+    with no email/phone stored.
+    """
+    statement = select(Customer).order_by(Customer.id)
+    for value, kind, column in ((email, "email", Customer.email_bidx), (phone, "phone", Customer.phone_bidx)):
+        if value is None:
+            continue
+        index = encryptor.blind_index(value, kind)
+        if index is None:
+            return []
+        statement = statement.where(column == index)
+    if platform is not None:
+        statement = statement.where(Customer.platform == platform)
+    return list(db.scalars(statement))
+
+def backfill_blind_indexes(db: Session, batch_size: int = 1000, rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Compute missing email/phone blind indexes (or all of them with rebuild=True, e.g. after
+    changing BLIND_INDEX_KEY). Walks customers in id order, one committed batch at a time.
+    """
+    started = time.perf_counter()
+    updated = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        statement = select(Customer.id, Customer.email_encrypted, Customer.phone_encrypted).where(
+            Customer.id > last_id
+        ).order_by(Customer.id).limit(batch_size)
+        if not rebuild:
+            statement = statement.where(or_(
+                (Customer.email_encrypted.is_not(None)) & (Customer.email_bidx.is_(None)),
+                (Customer.phone_encrypted.is_not(None)) & (Customer.phone_bidx.is_(None))
+            ))
+        rows = db.execute(statement).all()
+        if not rows:
+            break
+
+        values = []
+        for customer_id, email_encrypted, phone_encrypted in rows:
+            try:
+                values.append({
+                    "id": customer_id,
+                    "email_bidx": encryptor.blind_index(encryptor.decrypt(email_encrypted), "email"),
+                    "phone_bidx": encryptor.blind_index(encryptor.decrypt(phone_encrypted), "phone")
+                })
+            except InvalidToken:
+                failed += 1
+                logger.warning(f"Customer {customer_id}: could not decrypt email/phone, blind index skipped")
+        if values:
+            db.execute(update(Customer), values)
+        db.commit()
+
+        updated += len(values)
+        last_id = rows[-1][0]
+        logger.info(f"Backfilled blind indexes for {updated} customers")
+
+    return {
+        "updated": updated,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - started, 2)
+    }
@@ -0,0 +1,131 @@
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import func, case, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.database import Conversation, CustomerStats
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _aggregate(records: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Collapse saved conversation records into one delta per customer (records in save order)"""
+    deltas: Dict[int, Dict[str, Any]] = {}
+    for record in records:
+        delta = deltas.setdefault(record["customer_id"], {"messages": 0, "escalations": 0, "last_intent": None})
+        delta["messages"] += 1
+        delta["escalations"] += 1 if record.get("requires_human") else 0
+        delta["last_intent"] = record.get("intent")
+    return deltas
+
+def record_conversations(db: Session, records: List[Dict[str, Any]]):
+    """
+    Add saved conversations to the per-customer counters.
+
+    Runs inside the caller's transaction so counters commit atomically with the rows.
+    """
+    upsert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    for customer_id, delta in _aggregate(records).items():
+        if upsert is not None:
+            statement = upsert(CustomerStats).values(
+                customer_id=customer_id,
+                message_count=delta["messages"],
+                escalation_count=delta["escalations"],
+                last_intent=delta["last_intent"],
+                last_seen_at=func.now()
+            )
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[CustomerStats.customer_id],
+                set_={
+                    "message_count": CustomerStats.message_count + statement.excluded.message_count,
+                    "escalation_count": CustomerStats.escalation_count + statement.excluded.escalation_count,
+                    "last_intent": statement.excluded.last_intent,
+                    "last_seen_at": statement.excluded.last_seen_at
+                }
+            ))
+            continue
+
+        # Portable fallback: increment, insert when the row doesn't exist yet
+        result = db.execute(
+            update(CustomerStats)
+            .where(CustomerStats.customer_id == customer_id)
+            .values(
+                message_count=CustomerStats.message_count + delta["messages"],
+                escalation_count=CustomerStats.escalation_count + delta["escalations"],
+                last_intent=delta["last_intent"],
+                last_seen_at=func.now()
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(CustomerStats).values(
+                customer_id=customer_id,
+                message_count=delta["messages"],
+                escalation_count=delta["escalations"],
+                last_intent=delta["last_intent"],
+                last_seen_at=func.now()
+            ))
+
+def get_customer_stats(db: Session, customer_id: int) -> Optional[CustomerStats]:
+    """O(1) primary-key read of a customer's counters"""
+    return db.get(CustomerStats, customer_id)
+
+def get_customer_stats_many(db: Session, customer_ids: List[int]) -> Dict[int, CustomerStats]:
+    """Counters for several customers in one query (missing customers are absent)"""
+    if not customer_ids:
+        return {}
+    return {
+        stats.customer_id: stats
+        for stats in db.query(CustomerStats).filter(CustomerStats.customer_id.in_(customer_ids))
+    }
+
+def reconcile_customer_stats(db: Session, batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Rebuild counters from the conversations table (backfill / drift repair).
+
+    Works through customers in id order, one committed batch at a time.
+    """
+    started = time.perf_counter()
+    customers = 0
+    last_id = 0
+
+    while True:
+        rows = db.query(
+            Conversation.customer_id,
+            func.count(Conversation.id),
+            func.sum(case((Conversation.requires_human == True, 1), else_=0)),  # noqa: E712
+            func.max(Conversation.created_at),
+            func.max(Conversation.id)
+        ).filter(
+            Conversation.customer_id > last_id
+        ).group_by(Conversation.customer_id).order_by(Conversation.customer_id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        latest_ids = [row[4] for row in rows]
+        last_intents = dict(db.query(Conversation.customer_id, Conversation.intent).filter(
+            Conversation.id.in_(latest_ids)
+        ).all())
+
+        for customer_id, count, escalations, last_seen, _ in rows:
+            db.merge(CustomerStats(
+                customer_id=customer_id,
+                message_count=count,
+                escalation_count=escalations or 0,
+                last_intent=last_intents.get(customer_id),
+                last_seen_at=last_seen
+            ))
+        db.commit()
+
+        customers += len(rows)
+        last_id = rows[-1][0]
+        logger.info(f"Reconciled stats for {customers} customers")
+
+    return {
+        "customers": customers,
+        "seconds": round(time.perf_counter() - started, 2)
+    }
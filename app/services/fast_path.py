@@ -0,0 +1,103 @@
+import json
+import logging
+import re
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from config.settings import settings, project_path
+
+logger = logging.getLogger(__name__)
+
+# Confidence for a message that matches an answer pattern outright
+PATTERN_CONFIDENCE = 0.95
+# Each extra sentence/question makes it less likely the template covers everything
+EXTRA_SENTENCE_PENALTY = 0.15
+
+class FastPathRouter:
+    """Answer templated FAQ intents from a local, versioned answer table - no LLM call"""
+
+    def __init__(self, answers_file: str, thresholds: Dict[str, float]):
+        self.thresholds = thresholds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.hits_by_answer: Dict[str, int] = {}
+        self.route_seconds = 0.0
+        self.load(answers_file)
+
+    def load(self, answers_file: str):
+        """Load (or reload) the answer table"""
+        with open(project_path(answers_file), encoding="utf-8") as f:
+            table = json.load(f)
+
+        self.version = table["version"]
+        self.exclude = [re.compile(p, re.IGNORECASE) for p in table.get("exclude_patterns", [])]
+        self.answers = [
+            {
+                "id": entry["id"],
+                "intent": entry["intent"],
+                "answer": entry["answer"],
+                "patterns": [re.compile(p, re.IGNORECASE) for p in entry["patterns"]]
+            }
+            for entry in table["answers"]
+            if entry["intent"] in self.thresholds
+        ]
+        logger.info(f"Loaded fast-path answer table {self.version} ({len(self.answers)} answers)")
+
+    def classify(self, user_message: str) -> Optional[Dict[str, Any]]:
+        """Best matching answer and its confidence, or None"""
+        message = " ".join(user_message.lower().split())
+        if not message or any(p.search(message) for p in self.exclude):
+            return None
+
+        sentences = [part for part in re.split(r"[.!?]+", message) if part.strip()]
+        confidence = PATTERN_CONFIDENCE - EXTRA_SENTENCE_PENALTY * max(0, len(sentences) - 1)
+
+        for entry in self.answers:
+            if any(p.search(message) for p in entry["patterns"]):
+                return {"entry": entry, "confidence": round(confidence, 2)}
+        return None
+
+    def route(self, user_message: str) -> Optional[Dict[str, Any]]:
+        """Return a templated answer when the classifier is confident enough"""
+        started = time.perf_counter()
+        match = self.classify(user_message)
+        accepted = match is not None and match["confidence"] >= self.thresholds[match["entry"]["intent"]]
+
+        with self._lock:
+            self.route_seconds += time.perf_counter() - started
+            if not accepted:
+                self.misses += 1
+                return None
+            entry = match["entry"]
+            self.hits += 1
+            self.hits_by_answer[entry["id"]] = self.hits_by_answer.get(entry["id"], 0) + 1
+
+        return {
+            "response": entry["answer"],
+            "intent": entry["intent"],
+            "confidence": match["confidence"],
+            "source": "fast_path",
+            "answer_id": entry["id"],
+            "answer_version": self.version
+        }
+
+    def stats(self, llm_latency: Optional[float] = None) -> Dict[str, Any]:
+        """Hit-rate counters; latency saved is estimated from the observed LLM latency"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": settings.FAST_PATH_ENABLED,
+                "answer_version": self.version,
+                "thresholds": self.thresholds,
+                "routed": self.hits,
+                "sent_to_llm": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "hits_by_answer": dict(self.hits_by_answer),
+                "avg_route_ms": round(self.route_seconds / total * 1000, 3) if total else 0.0,
+                "estimated_latency_saved_ms": round(self.hits * llm_latency * 1000) if llm_latency else None
+            }
+
+# Global fast-path router instance
+fast_path_router = FastPathRouter(settings.FAST_PATH_ANSWERS_FILE, settings.FAST_PATH_THRESHOLDS)
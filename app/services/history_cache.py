@@ -0,0 +1,114 @@
+import logging
+import sys
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Turn = Tuple[str, str]  # (user message, AI response)
+
+def _turn_size(turn: Turn) -> int:
+    return sys.getsizeof(turn[0]) + sys.getsizeof(turn[1])
+
+class ConversationWindowCache:
+    """
+    Write-through cache of each customer's most recent turns.
+
+    Windows are fixed-size ring buffers of (user, ai) tuples kept in LRU order; the
+    least recently used customers are evicted once the customer or memory cap is hit.
+    """
+
+    def __init__(self, window: int, max_customers: int, max_bytes: int):
+        self.window = window
+        self.max_customers = max_customers
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._windows: "OrderedDict[int, deque]" = OrderedDict()
+        self._sizes: Dict[int, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, customer_id: int) -> Optional[List[Turn]]:
+        """Recent turns oldest first, or None on a cold miss"""
+        with self._lock:
+            turns = self._windows.get(customer_id)
+            if turns is None:
+                self.misses += 1
+                return None
+            self._windows.move_to_end(customer_id)
+            self.hits += 1
+            return list(turns)
+
+    def load(self, customer_id: int, turns: List[Turn]):
+        """Populate a window after a cold miss"""
+        with self._lock:
+            if customer_id in self._windows:
+                self._drop(customer_id)
+            window = deque(turns[-self.window:], maxlen=self.window)
+            size = sum(_turn_size(turn) for turn in window)
+            self._windows[customer_id] = window
+            self._sizes[customer_id] = size
+            self.bytes += size
+            self._enforce_limits()
+
+    def append(self, customer_id: int, user_message: str, ai_response: str):
+        """Write-through of a saved turn; cold customers are left to load from the DB"""
+        with self._lock:
+            window = self._windows.get(customer_id)
+            if window is None:
+                return
+            turn = (user_message, ai_response or "")
+            delta = _turn_size(turn)
+            if len(window) == window.maxlen:
+                delta -= _turn_size(window[0])  # the ring buffer drops the oldest turn
+            window.append(turn)
+            self._sizes[customer_id] += delta
+            self.bytes += delta
+            self._windows.move_to_end(customer_id)
+            self._enforce_limits()
+
+    def invalidate(self, customer_id: Optional[int] = None):
+        with self._lock:
+            if customer_id is None:
+                self._windows.clear()
+                self._sizes.clear()
+                self.bytes = 0
+            elif customer_id in self._windows:
+                self._drop(customer_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.HISTORY_CACHE_ENABLED,
+                "customers": len(self._windows),
+                "max_customers": self.max_customers,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "window": self.window,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _drop(self, customer_id: int):
+        del self._windows[customer_id]
+        self.bytes -= self._sizes.pop(customer_id)
+
+    def _enforce_limits(self):
+        while self._windows and (len(self._windows) > self.max_customers or self.bytes > self.max_bytes):
+            self._drop(next(iter(self._windows)))
+            self.evictions += 1
+
+# Global conversation window cache instance
+history_cache = ConversationWindowCache(
+    window=settings.HISTORY_WINDOW,
+    max_customers=settings.HISTORY_CACHE_MAX_CUSTOMERS,
+    max_bytes=settings.HISTORY_CACHE_MAX_BYTES
+)
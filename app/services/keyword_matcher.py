@@ -0,0 +1,143 @@
+import json
+import logging
+import re
+from typing import Dict, Any, List
+
+from config.settings import settings, project_path
+
+logger = logging.getLogger(__name__)
+
+ESCALATION = "__escalation__"
+
+def _trie_regex(phrases: List[str]) -> str:
+    """Compile phrases into one prefix-sharing regex that matches the longest phrase at a position"""
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A phrase ends here but longer ones continue - greedy optional keeps the longest
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+class KeywordMatch:
+    """Result of classifying one message"""
+
+    __slots__ = ("intent", "scores", "keywords", "escalation_keywords", "requires_human")
+
+    def __init__(self, intent: str, scores: Dict[str, float], keywords: List[str],
+                 escalation_keywords: List[str], requires_human: bool):
+        self.intent = intent
+        self.scores = scores
+        self.keywords = keywords
+        self.escalation_keywords = escalation_keywords
+        self.requires_human = requires_human
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "intent": self.intent,
+            "scores": self.scores,
+            "keywords": self.keywords,
+            "escalation_keywords": self.escalation_keywords,
+            "requires_human": self.requires_human
+        }
+
+class KeywordMatcher:
+    """
+    Finds every intent and escalation keyword in a single pass over the message.
+
+    All phrases are compiled into one trie-shaped regex scanned with a lookahead, so
+    matching cost grows with message length rather than with the number of phrases.
+    """
+
+    def __init__(self, intents: Dict[str, List[str]], escalation_keywords: List[str],
+                 escalation_intents: List[str], fallback_intent: str = "general_help"):
+        self.intent_order = list(intents)
+        self.fallback_intent = fallback_intent
+        self.escalation_intents = set(escalation_intents)
+
+        # phrase -> labels (intent names and/or ESCALATION)
+        self.labels: Dict[str, set] = {}
+        for intent, phrases in intents.items():
+            for phrase in phrases:
+                self.labels.setdefault(phrase.lower(), set()).add(intent)
+        for phrase in escalation_keywords:
+            self.labels.setdefault(phrase.lower(), set()).add(ESCALATION)
+
+        # The scan reports the longest phrase at each position; shorter phrases that are
+        # prefixes of it also occurred there, so precompute that closure once.
+        phrases = sorted(self.labels)
+        self.prefixes = {
+            phrase: [phrase[:end] for end in range(1, len(phrase) + 1) if phrase[:end] in self.labels]
+            for phrase in phrases
+        }
+        self.pattern = re.compile("(?=(" + _trie_regex(phrases) + "))") if phrases else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "KeywordMatcher":
+        with open(project_path(path), encoding="utf-8") as f:
+            table = json.load(f)
+        matcher = cls(
+            intents=table["intents"],
+            escalation_keywords=table.get("escalation_keywords", []),
+            escalation_intents=table.get("escalation_intents", []),
+            fallback_intent=table.get("fallback_intent", "general_help")
+        )
+        logger.info(f"Loaded keyword tables from {path} ({len(matcher.labels)} phrases)")
+        return matcher
+
+    def find(self, message: str) -> List[str]:
+        """Every known phrase occurring in the message"""
+        if self.pattern is None:
+            return []
+        found = set()
+        for match in self.pattern.finditer(message.lower()):
+            longest = match.group(1)
+            if longest:
+                found.update(self.prefixes[longest])
+        return sorted(found)
+
+    def analyze(self, message: str) -> KeywordMatch:
+        """Classify one message: per-intent scores, best intent and escalation"""
+        found = self.find(message)
+        weights: Dict[str, float] = {}
+        escalation_keywords = []
+        for phrase in found:
+            for label in self.labels[phrase]:
+                if label == ESCALATION:
+                    escalation_keywords.append(phrase)
+                else:
+                    # Multi-word phrases are more specific than single words
+                    weights[label] = weights.get(label, 0.0) + len(phrase.split())
+
+        total = sum(weights.values())
+        scores = {intent: round(weight / total, 3) for intent, weight in weights.items()} if total else {}
+
+        # The fallback intent only wins when nothing more specific matched; ties go to table order
+        specific = [intent for intent in self.intent_order if intent in weights and intent != self.fallback_intent]
+        intent = max(specific, key=lambda i: (weights[i], -self.intent_order.index(i))) if specific else self.fallback_intent
+
+        return KeywordMatch(
+            intent=intent,
+            scores=scores,
+            keywords=[phrase for phrase in found if self.labels[phrase] - {ESCALATION}],
+            escalation_keywords=escalation_keywords,
+            requires_human=intent in self.escalation_intents or bool(escalation_keywords)
+        )
+
+    def analyze_batch(self, messages: List[str]) -> List[KeywordMatch]:
+        """Classify many messages at once"""
+        return [self.analyze(message) for message in messages]
+
+# Global keyword matcher instance
+keyword_matcher = KeywordMatcher.from_file(settings.KEYWORDS_FILE)
@@ -0,0 +1,271 @@
+import asyncio
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Mapping
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0  # escalations and returning customers
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2  # batch / demo traffic
+LANES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+class SchedulerTimeout(Exception):
+    """No capacity became available before the caller's deadline"""
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from Groq-style reset values ("7.66s", "2m59.56s", "120ms") or plain numbers"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+class TokenBucket:
+    """
+    Quota bucket learned from rate-limit headers; unlimited until the API reports one.
+
+    The provider reports limit, remaining and time-to-full, so the refill rate is taken
+    as (limit - remaining) / reset rather than assumed from a fixed window.
+    """
+
+    def __init__(self):
+        self.capacity: Optional[float] = None
+        self.level = 0.0
+        self.rate = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + self.rate * (now - self.updated))
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` is available (0 = now)"""
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)  # oversize requests wait for a full bucket
+        if self.level >= needed or self.rate <= 0:
+            return 0.0  # no refill rate learned yet - don't hold calls on a guess
+        return (needed - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        if self.capacity is not None:
+            self._refill(now)
+            self.level -= amount
+
+    def update(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float], now: float):
+        if limit is None or remaining is None:
+            return
+        if self.capacity is None:
+            self.level = remaining
+        else:
+            # A response's "remaining" predates requests admitted since it was sent, so
+            # headers may only lower the local estimate (other clients share the quota)
+            self._refill(now)
+            self.level = min(self.level, remaining)
+        self.capacity = limit
+        self.updated = now
+        rate = (limit - remaining) / reset if reset else limit / 60.0
+        if rate > 0:  # a full bucket (remaining == limit) says nothing about the refill rate
+            self.rate = rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.capacity is None:
+            return {"known": False}
+        self._refill(time.monotonic())
+        return {"known": True, "capacity": self.capacity, "available": round(self.level, 1),
+                "refill_per_second": round(self.rate, 3)}
+
+class ModelQuota:
+    def __init__(self):
+        self.requests = TokenBucket()
+        self.tokens = TokenBucket()
+        self.blocked_until = 0.0
+        self.rate_limited = 0
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(self.blocked_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+class LLMScheduler:
+    """
+    Central admission control for LLM calls.
+
+    Every attempt takes a slot: the global concurrency cap must have room and the model's
+    request/token buckets (fed by x-ratelimit-* and Retry-After headers) must cover it.
+    Waiters are served by priority lane, then arrival. The low lane only uses the share of
+    slots not reserved for interactive traffic.
+    """
+
+    def __init__(self, max_concurrency: int, low_priority_share: float):
+        self.max_concurrency = max_concurrency
+        self.low_priority_limit = max(1, int(max_concurrency * low_priority_share))
+        self.in_flight = 0
+        self._lock = threading.Lock()  # stats are also read by the metrics collector off the event loop
+        self._quotas: Dict[str, ModelQuota] = {}
+        self._waiters: List[list] = []  # [priority, seq, model, tokens, future]
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._waits = {lane: deque(maxlen=1000) for lane in LANES}
+        self.granted = {lane: 0 for lane in LANES}
+        self.timed_out = 0
+
+    @asynccontextmanager
+    async def slot(self, model: str, tokens: int, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None):
+        await self.acquire(model, tokens, priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, model: str, tokens: int, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        if not self._waiters and self._try_take(model, tokens, priority, started) is True:
+            self._record_grant(priority, 0.0)
+            return
+
+        entry = [priority, next(self._sequence), model, tokens, loop.create_future()]
+        self._waiters.append(entry)
+        self._wake()
+        try:
+            await asyncio.wait_for(asyncio.shield(entry[4]), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            elif entry[4].done():
+                self.release()  # granted just as we gave up
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise SchedulerTimeout(f"No LLM capacity for {model} within {timeout:.1f}s")
+            raise
+        self._record_grant(priority, time.monotonic() - started)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def observe(self, model: str, status_code: int, headers: Mapping[str, str]):
+        """Feed rate-limit headers (and 429s) from a response into the model's quota"""
+        now = time.monotonic()
+
+        def number(name: str) -> Optional[float]:
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        with self._lock:
+            quota = self._quota(model)
+            quota.requests.update(number("x-ratelimit-limit-requests"), number("x-ratelimit-remaining-requests"),
+                                  parse_duration(headers.get("x-ratelimit-reset-requests")), now)
+            quota.tokens.update(number("x-ratelimit-limit-tokens"), number("x-ratelimit-remaining-tokens"),
+                                parse_duration(headers.get("x-ratelimit-reset-tokens")), now)
+            if status_code == 429:
+                retry_after = (parse_duration(headers.get("retry-after"))
+                               or parse_duration(headers.get("x-ratelimit-reset-tokens"))
+                               or settings.LLM_DEFAULT_RETRY_AFTER)
+                quota.blocked_until = max(quota.blocked_until, now + retry_after)
+                quota.rate_limited += 1
+                logger.warning(f"Model {model} rate limited; holding requests for {retry_after:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for priority, lane in LANES.items():
+            waits = sorted(self._waits[priority])
+            lanes[lane] = {
+                "queued": sum(1 for entry in self._waiters if entry[0] == priority),
+                "granted": self.granted[priority],
+                "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p95_wait_ms": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else 0.0
+            }
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                model: {
+                    "requests": quota.requests.to_dict(),
+                    "tokens": quota.tokens.to_dict(),
+                    "blocked_for_seconds": round(max(0.0, quota.blocked_until - now), 1),
+                    "rate_limited": quota.rate_limited
+                }
+                for model, quota in self._quotas.items()
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "low_priority_limit": self.low_priority_limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "timed_out": self.timed_out,
+            "lanes": lanes,
+            "models": models
+        }
+
+    def _quota(self, model: str) -> ModelQuota:
+        quota = self._quotas.get(model)
+        if quota is None:
+            quota = self._quotas[model] = ModelQuota()
+        return quota
+
+    def _try_take(self, model: str, tokens: int, priority: int, now: float):
+        """True when a slot was taken; otherwise seconds until the quota allows it (0 = concurrency-bound)"""
+        limit = self.low_priority_limit if priority == PRIORITY_LOW else self.max_concurrency
+        if self.in_flight >= limit:
+            return 0.0
+        with self._lock:
+            quota = self._quota(model)
+            wait = quota.wait_time(tokens, now)
+            if wait > 0:
+                return wait
+            quota.requests.take(1, now)
+            quota.tokens.take(tokens, now)
+        self.in_flight += 1
+        return True
+
+    def _wake(self):
+        """Grant waiting callers in lane order; re-arm a timer for quota-blocked ones"""
+        now = time.monotonic()
+        retry_in = None
+        for entry in sorted(self._waiters, key=lambda waiter: (waiter[0], waiter[1])):
+            if self.in_flight >= self.max_concurrency:
+                break
+            if entry[4].done():
+                continue
+            taken = self._try_take(entry[2], entry[3], entry[0], now)
+            if taken is True:
+                self._waiters.remove(entry)
+                entry[4].set_result(None)
+            elif taken > 0:
+                retry_in = taken if retry_in is None else min(retry_in, taken)
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if retry_in is not None and self._waiters:
+            self._timer = asyncio.get_running_loop().call_later(retry_in, self._wake)
+
+    def _record_grant(self, priority: int, waited: float):
+        self.granted[priority] += 1
+        self._waits[priority].append(waited)
+
+# Global LLM scheduler instance
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    low_priority_share=settings.LLM_LOW_PRIORITY_SHARE
+)
@@ -0,0 +1,188 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import httpx
+
+from app.models.database import secure_session
+from app.services.conversation_manager import get_conversation_manager
+from app.services.social_simulator import SocialSimulator, QUESTIONS
+
+logger = logging.getLogger(__name__)
+
+# Per-user conversation scripts: each scripted user works through one, a message per arrival
+CONVERSATION_SCRIPTS = [
+    ["Hi!", "Where is my order #ORD12345?", "Can I change my shipping address?", "thanks!"],
+    ["Do you have this in blue?", "What sizes do you have?", "Do you have size guides?", "How long does shipping take?"],
+    ["My order arrived damaged, what should I do?", "What's your return policy?", "How long does a refund take?"],
+    ["Do you ship to Canada?", "What's the estimated delivery time?", "Is this product in stock?"]
+]
+
+# (seconds after the previous message, user id, message)
+Arrival = Tuple[float, str, str]
+
+def poisson_arrivals(simulator: SocialSimulator, rate: float, rng: random.Random) -> Iterator[Arrival]:
+    """Independent messages from random users, exponentially distributed gaps"""
+    while True:
+        yield rng.expovariate(rate), simulator.pick_user(rng=rng)["id"], rng.choice(QUESTIONS)
+
+def burst_arrivals(simulator: SocialSimulator, rate: float, rng: random.Random,
+                   burst_size: int = 3, typing_gap: float = 0.5) -> Iterator[Arrival]:
+    """Users sending several messages back to back; bursts start as a Poisson process and overlap"""
+    pending: List[Tuple[float, int, str, str]] = []  # (at, seq, user id, message) across open bursts
+    sequence = itertools.count()
+    now = 0.0
+    next_burst = rng.expovariate(rate / burst_size)
+    while True:
+        if not pending or next_burst <= pending[0][0]:
+            user_id = simulator.pick_user(rng=rng)["id"]
+            at = next_burst
+            for _ in range(rng.randint(1, burst_size * 2 - 1)):  # mean burst_size
+                heapq.heappush(pending, (at, next(sequence), user_id, rng.choice(QUESTIONS)))
+                at += rng.uniform(0.1, typing_gap * 2)
+            next_burst += rng.expovariate(rate / burst_size)
+            continue
+        at, _, user_id, text = heapq.heappop(pending)
+        yield at - now, user_id, text
+        now = at
+
+def scripted_arrivals(simulator: SocialSimulator, rate: float, rng: random.Random) -> Iterator[Arrival]:
+    """Poisson arrivals where each user walks through a conversation script, then starts another"""
+    progress: Dict[str, Tuple[List[str], int]] = {}
+    while True:
+        user_id = simulator.pick_user(rng=rng)["id"]
+        script, step = progress.get(user_id) or (rng.choice(CONVERSATION_SCRIPTS), 0)
+        progress[user_id] = (script, step + 1) if step + 1 < len(script) else (rng.choice(CONVERSATION_SCRIPTS), 0)
+        yield rng.expovariate(rate), user_id, script[step]
+
+ARRIVALS = {"poisson": poisson_arrivals, "burst": burst_arrivals, "scripted": scripted_arrivals}
+
+class InProcessTarget:
+    """Feeds ConversationManager directly, one session per message (no HTTP in the way)"""
+
+    name = "in-process"
+
+    def __init__(self, priority: Optional[int] = None):
+        self.priority = priority
+
+    async def send(self, user: Dict[str, Any], message: str) -> Dict[str, Any]:
+        db = secure_session.SessionLocal()
+        try:
+            return await get_conversation_manager(db).aprocess_message(
+                message, user["id"], user["platform"], priority=self.priority
+            )
+        finally:
+            db.close()
+
+    async def aclose(self):
+        pass
+
+class HttpTarget:
+    """Posts to /ai/chat of a running app"""
+
+    name = "http"
+
+    def __init__(self, base_url: str, timeout: float = 60.0, max_connections: int = 200):
+        self.client = httpx.AsyncClient(
+            base_url=base_url, timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def send(self, user: Dict[str, Any], message: str) -> Dict[str, Any]:
+        response = await self.client.post("/ai/chat", params={
+            "message": message, "social_media_id": user["id"], "platform": user["platform"]
+        })
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class LoadDriver:
+    """
+    Open-loop traffic at a target rate: messages are sent on the arrival schedule whether
+    or not earlier ones have finished, like real customers. Arrivals beyond max_in_flight
+    are dropped and counted, so an overloaded pipeline shows up as drops and latency
+    rather than as a silently lower offered rate.
+    """
+
+    def __init__(self, simulator: SocialSimulator, target, rate: float, arrival: str = "poisson",
+                 max_in_flight: int = 500, seed: Optional[int] = None, record_responses: bool = True):
+        self.simulator = simulator
+        self.target = target
+        self.rate = rate
+        self.arrival = arrival
+        self.max_in_flight = max_in_flight
+        self.rng = random.Random(seed)
+        self.record_responses = record_responses
+        self.latencies: List[float] = []
+        self.sent = 0
+        self.errors = 0
+        self.dropped = 0
+        self.in_flight = 0
+
+    async def run(self, duration: float) -> Dict[str, Any]:
+        arrivals = ARRIVALS[self.arrival](self.simulator, self.rate, self.rng)
+        tasks = set()
+        started = time.perf_counter()
+        next_at = started
+        for gap, user_id, text in arrivals:
+            next_at += gap  # absolute schedule, so slow iterations don't lower the offered rate
+            if next_at - started >= duration:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.in_flight >= self.max_in_flight:
+                self.dropped += 1
+                continue
+            self.in_flight += 1
+            task = asyncio.create_task(self._send(user_id, text))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        offered_seconds = time.perf_counter() - started
+        if tasks:
+            await asyncio.gather(*tasks)
+        return self.report(offered_seconds, time.perf_counter() - started)
+
+    async def _send(self, user_id: str, text: str):
+        self.sent += 1
+        message = self.simulator.simulate_incoming_message(user_id=user_id, text=text)
+        started = time.perf_counter()
+        try:
+            result = await self.target.send(self.simulator.get_user(user_id), message["message"])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Simulated message from {user_id} failed: {e}")
+            return
+        finally:
+            self.in_flight -= 1
+        self.latencies.append(time.perf_counter() - started)
+        if self.record_responses:
+            self.simulator.simulate_ai_response(user_id, result["response"], result.get("intent"))
+
+    def report(self, offered_seconds: float, total_seconds: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 1) if latencies else 0.0
+
+        return {
+            "target": self.target.name,
+            "arrival": self.arrival,
+            "target_rate": self.rate,
+            "offered_rate": round((self.sent + self.dropped) / offered_seconds, 1) if offered_seconds else 0.0,
+            "achieved_rps": round(len(latencies) / total_seconds, 1) if total_seconds else 0.0,
+            "sent": self.sent,
+            "completed": len(latencies),
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "seconds": round(total_seconds, 2),
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99),
+                           "max": round(latencies[-1] * 1000, 1) if latencies else 0.0}
+        }
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Callable, Awaitable, Hashable, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BurstHandler = Callable[[List[str]], Awaitable[Dict[str, Any]]]
+
+class _Burst:
+    def __init__(self, handler: BurstHandler, started: float):
+        self.handler = handler
+        self.started = started
+        self.messages: List[str] = []
+        self.waiters: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class MessageCoalescer:
+    """
+    Per-customer debounce for bursts of short messages.
+
+    Messages for the same key that arrive within ``window`` of each other (capped at
+    ``max_wait`` from the first one, or ``max_messages``) are handed to one handler call,
+    and every waiting caller receives its result. Bursts for a key run one after another,
+    so replies never overtake each other.
+    """
+
+    def __init__(self, window: float, max_wait: float, max_messages: int):
+        self.window = window
+        self.max_wait = max_wait
+        self.max_messages = max_messages
+        self._bursts: Dict[Hashable, _Burst] = {}
+        self._running: Dict[Hashable, asyncio.Task] = {}
+        self.messages = 0
+        self.bursts = 0
+
+    async def submit(self, key: Hashable, message: str, handler: BurstHandler) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _Burst(handler, loop.time())
+        waiter = loop.create_future()
+        burst.messages.append(message)
+        burst.waiters.append(waiter)
+        self.messages += 1
+
+        if burst.timer is not None:
+            burst.timer.cancel()
+        if len(burst.messages) >= self.max_messages:
+            self._flush(key)
+        else:
+            delay = min(self.window, burst.started + self.max_wait - loop.time())
+            burst.timer = loop.call_later(max(delay, 0), self._flush, key)
+        return await waiter
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.COALESCE_ENABLED,
+            "window_ms": round(self.window * 1000),
+            "messages": self.messages,
+            "bursts": self.bursts,
+            "generations_saved": self.messages - self.bursts - sum(len(b.messages) for b in self._bursts.values()),
+            "pending_customers": len(self._bursts)
+        }
+
+    def _flush(self, key: Hashable):
+        burst = self._bursts.pop(key, None)
+        if burst is None:
+            return
+        self.bursts += 1
+        previous = self._running.get(key)
+        task = asyncio.ensure_future(self._run(burst, previous))
+        self._running[key] = task
+        task.add_done_callback(lambda done: self._running.pop(key, None) if self._running.get(key) is done else None)
+
+    async def _run(self, burst: _Burst, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.wait([previous])  # keep this customer's replies in order
+        try:
+            result = await burst.handler(burst.messages)
+        except Exception as e:
+            logger.error(f"Coalesced generation for {len(burst.messages)} messages failed: {e}")
+            for waiter in burst.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        for waiter in burst.waiters:
+            if not waiter.done():  # the caller may have disconnected
+                waiter.set_result({**result, "coalesced_messages": len(burst.messages)})
+
+# Global message coalescer instance
+message_coalescer = MessageCoalescer(
+    window=settings.COALESCE_WINDOW_MS / 1000,
+    max_wait=settings.COALESCE_MAX_WAIT_MS / 1000,
+    max_messages=settings.COALESCE_MAX_MESSAGES
+)
@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Error codes Groq returns for models that will never work again
+DECOMMISSIONED_MARKERS = ("model_decommissioned", "decommissioned", "model_not_found", "does not exist")
+
+class ModelHealth:
+    """Rolling health window and circuit state for one model"""
+
+    def __init__(self, name: str, priority: int, window: int):
+        self.name = name
+        self.priority = priority
+        self.samples = deque(maxlen=window)  # (latency_seconds, ok)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.open_for = 0.0
+        self.probe_in_flight = False
+        self.decommissioned = False
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def p95_latency(self) -> Optional[float]:
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p95 = self.p95_latency
+        return {
+            "model": self.name,
+            "state": self.state,
+            "decommissioned": self.decommissioned,
+            "samples": len(self.samples),
+            "error_rate": round(self.error_rate, 3),
+            "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "retry_in_seconds": round(max(0.0, self.opened_at + self.open_for - time.monotonic()), 1) if self.state == OPEN else 0
+        }
+
+class ModelRouter:
+    """Per-model circuit breaker with latency-aware ordering of the fallback chain"""
+
+    def __init__(self, models: List[str]):
+        self._lock = threading.Lock()
+        self.models = {
+            name: ModelHealth(name, priority, settings.MODEL_HEALTH_WINDOW)
+            for priority, name in enumerate(models)
+        }
+
+    def candidates(self) -> List[str]:
+        """Models worth trying right now, fastest healthy first"""
+        now = time.monotonic()
+        available = []
+        with self._lock:
+            for health in self.models.values():
+                if health.state == OPEN and now - health.opened_at >= health.open_for:
+                    health.state = HALF_OPEN
+                    health.probe_in_flight = False
+                if health.state == CLOSED or (health.state == HALF_OPEN and not health.probe_in_flight):
+                    available.append(health)
+
+        # Measured models sort by p95, unmeasured ones follow in configured order.
+        # Recovering models go last so a probe only costs time when the rest failed.
+        def sort_key(health: ModelHealth):
+            p95 = health.p95_latency
+            return (health.state == HALF_OPEN, p95 if p95 is not None else float("inf"), health.priority)
+
+        return [h.name for h in sorted(available, key=sort_key)]
+
+    def acquire(self, model: str) -> bool:
+        """Claim a model for one attempt; only one probe at a time may hit a half-open model"""
+        with self._lock:
+            health = self.models.get(model)
+            if health is None or health.state == CLOSED:
+                return True
+            if health.state == HALF_OPEN and not health.probe_in_flight:
+                health.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, model: str, latency: float):
+        with self._lock:
+            health = self.models.get(model)
+            if health is None:
+                return
+            if health.state == HALF_OPEN:
+                logger.info(f"Model {model} recovered, closing circuit")
+                health.samples.clear()
+                health.state = CLOSED
+                health.probe_in_flight = False
+            health.samples.append((latency, True))
+            self._check_latency(health)
+
+    def record_failure(self, model: str, latency: float, status_code: Optional[int] = None, detail: str = ""):
+        with self._lock:
+            health = self.models.get(model)
+            if health is None:
+                return
+            health.samples.append((latency, False))
+            detail = (detail or "").lower()
+            if status_code in (400, 404) and any(marker in detail for marker in DECOMMISSIONED_MARKERS):
+                health.decommissioned = True
+                self._open(health, settings.MODEL_DECOMMISSION_COOLDOWN_SECONDS, "decommissioned")
+            elif health.state == HALF_OPEN:
+                self._open(health, settings.MODEL_COOLDOWN_SECONDS, "probe failed")
+            elif (len(health.samples) >= settings.MODEL_MIN_SAMPLES
+                  and health.error_rate >= settings.MODEL_ERROR_THRESHOLD):
+                self._open(health, settings.MODEL_COOLDOWN_SECONDS, f"error rate {health.error_rate:.0%}")
+
+    def release(self, model: str):
+        """Give back a half-open probe slot that ended without a verdict (e.g. cancelled hedge)"""
+        with self._lock:
+            health = self.models.get(model)
+            if health is not None and health.state == HALF_OPEN:
+                health.probe_in_flight = False
+
+    def _check_latency(self, health: ModelHealth):
+        if settings.MODEL_MAX_P95_SECONDS <= 0 or len(health.samples) < settings.MODEL_MIN_SAMPLES:
+            return
+        p95 = health.p95_latency
+        if p95 is not None and p95 > settings.MODEL_MAX_P95_SECONDS:
+            self._open(health, settings.MODEL_COOLDOWN_SECONDS, f"p95 latency {p95:.2f}s")
+
+    def _open(self, health: ModelHealth, seconds: float, reason: str):
+        health.state = OPEN
+        health.opened_at = time.monotonic()
+        health.open_for = seconds
+        health.probe_in_flight = False
+        logger.warning(f"Opened circuit for model {health.name} for {seconds:.0f}s: {reason}")
+
+    def mean_latency(self) -> Optional[float]:
+        """Mean latency of recent successful calls across all models"""
+        with self._lock:
+            latencies = [latency for health in self.models.values() for latency, ok in health.samples if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [health.to_dict() for health in self.models.values()]
+
+# Global model router instance
+model_router = ModelRouter(settings.GROQ_MODELS)
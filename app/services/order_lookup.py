@@ -0,0 +1,336 @@
+import csv
+import json
+import logging
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterator, List, Optional, Callable, Tuple
+
+from sqlalchemy import func, select, insert, update, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.database import OrderCache
+from config.security import encryptor
+from config.settings import settings, project_path
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+_ID_SEPARATORS = re.compile(r"[\s#-]+")
+
+class OrderSource(ABC):
+    """Where orders come from (POS, e-commerce API, ...). Orders are dicts keyed by "order_id"."""
+
+    @abstractmethod
+    def fetch(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """The orders found among order_ids, keyed by order id"""
+
+    @abstractmethod
+    def iter_batches(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Every order, batch_size at a time"""
+
+class FileOrderSource(OrderSource):
+    """
+    Local stand-in for the order system: a JSON list (or {"orders": [...]}) or a CSV file.
+
+    CSV items are "name x quantity" separated by ";". The file is re-read when it changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = project_path(path)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._orders: Dict[str, Dict[str, Any]] = {}
+
+    def fetch(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        orders = self._load()
+        return {order_id: orders[order_id] for order_id in order_ids if order_id in orders}
+
+    def iter_batches(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        orders = list(self._load().values())
+        for start in range(0, len(orders), batch_size):
+            yield orders[start:start + batch_size]
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            if mtime != self._mtime:
+                with open(self.path, encoding="utf-8", newline="") as f:
+                    rows = list(csv.DictReader(f)) if self.path.endswith(".csv") else json.load(f)
+                if isinstance(rows, dict):
+                    rows = rows["orders"]
+                self._orders = {
+                    order["order_id"]: order
+                    for order in (_normalize_order(row) for row in rows)
+                }
+                self._mtime = mtime
+                logger.info(f"Loaded {len(self._orders)} orders from {self.path}")
+            return self._orders
+
+def _normalize_order(row: Dict[str, Any]) -> Dict[str, Any]:
+    order = {key: value for key, value in row.items() if value not in (None, "")}
+    order["order_id"] = normalize_order_id(order["order_id"])
+    items = order.get("items")
+    if isinstance(items, str):
+        order["items"] = [_parse_item(item) for item in items.split(";") if item.strip()]
+    return order
+
+def _parse_item(text: str) -> Dict[str, Any]:
+    name, _, quantity = text.strip().rpartition(" x ")
+    if not name or not quantity.isdigit():
+        return {"name": text.strip(), "quantity": 1}
+    return {"name": name, "quantity": int(quantity)}
+
+def normalize_order_id(order_id: str) -> str:
+    return _ID_SEPARATORS.sub("", str(order_id)).upper()
+
+def summarize_order(order: Dict[str, Any], verified: bool = True) -> str:
+    """
+    One-line order summary for the prompt and for direct answers.
+
+    Unverified (the asker isn't known to own the order) gets status and ETA only - no
+    items, totals or tracking numbers.
+    """
+    parts = [f"Order {order['order_id']}: {order.get('status', 'status unknown')}"]
+    if verified and order.get("carrier"):
+        tracking = f" (tracking {order['tracking_number']})" if order.get("tracking_number") else ""
+        parts.append(f"via {order['carrier']}{tracking}")
+    if order.get("estimated_delivery"):
+        parts.append(f"estimated delivery {order['estimated_delivery']}")
+    if verified and order.get("items"):
+        items = ", ".join(f"{item.get('quantity', 1)}x {item['name']}" for item in order["items"])
+        parts.append(f"items: {items}")
+    if verified and order.get("total"):
+        parts.append(f"total {order['total']} {order.get('currency', '')}".rstrip())
+    return "; ".join(parts)
+
+class OrderService:
+    """
+    Read-through order lookup on the order_cache table.
+
+    Orders mentioned in a message and the customer's recent orders (matched on the email
+    blind index) come back from one query; only missing or stale mentioned orders go to the
+    source, and whatever it returns is upserted. If the source fails, stale rows are used.
+    Refreshes are upserted in a savepoint of the caller's transaction and never committed
+    here: the caller's own commit (or rollback) ends them.
+    """
+
+    def __init__(self, source: Optional[OrderSource], pattern: str, ttl: float, context_max: int,
+                 status_cue_pattern: str = settings.ORDER_STATUS_CUE_PATTERN,
+                 non_status_pattern: str = settings.ORDER_NON_STATUS_PATTERN):
+        self.source = source
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.status_cues = re.compile(status_cue_pattern, re.IGNORECASE)
+        self.non_status = re.compile(non_status_pattern, re.IGNORECASE)
+        self.ttl = ttl
+        self.context_max = context_max
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.cache_hits = 0
+        self.source_fetches = 0
+        self.source_errors = 0
+        self.stale_served = 0
+        self.not_found = 0
+        self.direct_answers = 0
+
+    def extract_order_ids(self, message: str) -> List[str]:
+        """Distinct normalized order IDs mentioned in a message, in order of appearance"""
+        return list(dict.fromkeys(normalize_order_id(match.group(0)) for match in self.pattern.finditer(message)))
+
+    def is_status_question(self, message: str) -> bool:
+        """Asks where an order is (status/tracking cue) and not to cancel, change, return or report it"""
+        return bool(self.status_cues.search(message)) and not self.non_status.search(message)
+
+    def orders_for_message(self, db: Session, message: str, email_bidx: Optional[str]) -> Dict[str, Any]:
+        """
+        Orders relevant to a message: {"mentioned": {id: order}, "missing": [ids], "recent": [orders]}.
+
+        Each order carries "verified": whether its email matches the customer's.
+        """
+        return self.orders_for_messages(db, [(message, email_bidx)])[0]
+
+    def orders_for_messages(self, db: Session, requests: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Set-based orders_for_message for (message, email_bidx) pairs: one query, one source fetch"""
+        wanted = [self.extract_order_ids(message)[:self.context_max] for message, _ in requests]
+        order_ids = list(dict.fromkeys(order_id for ids in wanted for order_id in ids))
+        email_bidxs = list(dict.fromkeys(email_bidx for _, email_bidx in requests if email_bidx))
+        if not order_ids and not email_bidxs:
+            return [{"mentioned": {}, "missing": [], "recent": []} for _ in requests]
+
+        conditions = []
+        if order_ids:
+            conditions.append(OrderCache.order_id.in_(order_ids))
+        if email_bidxs:
+            # Only the recent-orders branch is limited (per customer), so mentioned orders are always returned
+            ranked = select(
+                OrderCache.id,
+                func.row_number().over(partition_by=OrderCache.customer_email, order_by=OrderCache.id.desc()).label("rank")
+            ).where(OrderCache.customer_email.in_(email_bidxs)).subquery()
+            limit = self.context_max + max(len(ids) for ids in wanted)
+            conditions.append(OrderCache.id.in_(select(ranked.c.id).where(ranked.c.rank <= limit)))
+        rows = db.scalars(select(OrderCache).where(or_(*conditions)).order_by(OrderCache.id.desc())).all()
+        cached = {row.order_id: row for row in rows}
+
+        stale = {order_id for order_id in order_ids if order_id not in cached or not self._is_fresh(cached[order_id])}
+        fetched = {value["order_id"]: value for value in self._fetch(db, list(stale))} if stale else {}
+
+        results = []
+        for (_, email_bidx), ids in zip(requests, wanted):
+            mentioned: Dict[str, Dict[str, Any]] = {}
+            hits = stale_served = 0
+            for order_id in ids:
+                row = cached.get(order_id)
+                if order_id in fetched:
+                    value = fetched[order_id]
+                    mentioned[order_id] = self._as_dict(order_id, value["order_data"], value["customer_email"], email_bidx)
+                elif row is not None:
+                    mentioned[order_id] = self._as_dict(row.order_id, row.order_data, row.customer_email, email_bidx)
+                    if order_id in stale:
+                        stale_served += 1
+                    else:
+                        hits += 1
+            recent = [
+                self._as_dict(row.order_id, row.order_data, row.customer_email, email_bidx) for row in rows
+                if email_bidx and row.customer_email == email_bidx and row.order_id not in mentioned
+            ][:self.context_max]
+            missing = [order_id for order_id in ids if order_id not in mentioned]
+            with self._lock:
+                self.lookups += len(ids)
+                self.cache_hits += hits
+                self.stale_served += stale_served
+                self.not_found += len(missing)
+            results.append({"mentioned": mentioned, "missing": missing, "recent": recent})
+        return results
+
+    def answer(self, orders: Dict[str, Any]) -> Optional[str]:
+        """Direct reply for a status question when every mentioned order was found"""
+        if not orders["mentioned"] or orders["missing"]:
+            return None
+        lines = [summarize_order(order, order["verified"]) for order in orders["mentioned"].values()]
+        with self._lock:
+            self.direct_answers += 1
+        noun = "order" if len(lines) == 1 else "orders"
+        return f"Here's the latest on your {noun}:\n" + "\n".join(lines)
+
+    def context_summaries(self, orders: Dict[str, Any]) -> List[str]:
+        """Compact lines for the prompt's customer context"""
+        summaries = [summarize_order(order, order["verified"]) for order in orders["mentioned"].values()]
+        summaries += [summarize_order(order) for order in orders["recent"]]
+        summaries += [f"Order {order_id}: not found - ask the customer to double-check the number"
+                      for order_id in orders["missing"]]
+        return summaries
+
+    def sync(self, db: Session, batch_size: Optional[int] = None,
+             progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Bulk-load every order from the source, one committed upsert per batch"""
+        if self.source is None:
+            raise ValueError("No order source configured (set ORDER_SOURCE_FILE)")
+        batch_size = batch_size or settings.ORDER_SYNC_BATCH_SIZE
+        counters = {"orders": 0, "batches": 0}
+        started = time.perf_counter()
+        for batch in self.source.iter_batches(batch_size):
+            self._store(db, self._row_values(batch))
+            db.commit()
+            counters["orders"] += len(batch)
+            counters["batches"] += 1
+            if progress is not None:
+                progress(dict(counters))
+        counters["seconds"] = round(time.perf_counter() - started, 2)
+        logger.info(f"Order sync finished: {counters}")
+        return counters
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": settings.ORDER_LOOKUP_ENABLED,
+                "source": type(self.source).__name__ if self.source is not None else None,
+                "ttl_seconds": self.ttl,
+                "lookups": self.lookups,
+                "cache_hits": self.cache_hits,
+                "hit_rate": round(self.cache_hits / self.lookups, 3) if self.lookups else 0.0,
+                "source_fetches": self.source_fetches,
+                "source_errors": self.source_errors,
+                "stale_served": self.stale_served,
+                "not_found": self.not_found,
+                "direct_answers": self.direct_answers
+            }
+
+    def _fetch(self, db: Session, order_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch from the source and upsert (uncommitted); returns the row values"""
+        if self.source is None:
+            return []
+        try:
+            orders = list(self.source.fetch(order_ids).values())
+        except Exception as e:
+            with self._lock:
+                self.source_errors += 1
+            logger.warning(f"Order source lookup failed: {e}")
+            return []
+        with self._lock:
+            self.source_fetches += 1
+        if not orders:
+            return []
+        values = self._row_values(orders)
+        try:
+            with db.begin_nested():
+                self._store(db, values)
+        except Exception as e:
+            logger.warning(f"Could not cache fetched orders: {e}")  # still answered from the source
+        return values
+
+    @staticmethod
+    def _row_values(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """order_cache row values for source orders, one per order id"""
+        now = datetime.now(timezone.utc)
+        values = []
+        for order in orders:
+            order = _normalize_order(order)
+            values.append({
+                "order_id": order["order_id"],
+                "customer_email": encryptor.blind_index(order.pop("customer_email", ""), "email"),
+                "order_data": order,
+                "last_updated": now
+            })
+        return list({value["order_id"]: value for value in values}.values())  # one row per order per statement
+
+    def _store(self, db: Session, values: List[Dict[str, Any]]):
+        upsert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+        if upsert is not None:
+            statement = upsert(OrderCache)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[OrderCache.order_id],
+                set_={column: statement.excluded[column] for column in ("customer_email", "order_data", "last_updated")}
+            ), values)
+        else:
+            existing = set(db.scalars(select(OrderCache.order_id).where(
+                OrderCache.order_id.in_([value["order_id"] for value in values])
+            )))
+            new_rows = [value for value in values if value["order_id"] not in existing]
+            if new_rows:
+                db.execute(insert(OrderCache), new_rows)
+            for value in values:
+                if value["order_id"] in existing:
+                    db.execute(update(OrderCache).where(OrderCache.order_id == value["order_id"]).values(**value))
+
+    def _is_fresh(self, row: OrderCache) -> bool:
+        if row.last_updated is None:
+            return False
+        updated = row.last_updated if row.last_updated.tzinfo else row.last_updated.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - updated < timedelta(seconds=self.ttl)
+
+    @staticmethod
+    def _as_dict(order_id: str, order_data: Optional[Dict[str, Any]], order_email: Optional[str],
+                 email_bidx: Optional[str]) -> Dict[str, Any]:
+        return {**(order_data or {}), "order_id": order_id, "verified": bool(email_bidx) and order_email == email_bidx}
+
+# Global order service instance
+order_service = OrderService(
+    source=FileOrderSource(settings.ORDER_SOURCE_FILE) if settings.ORDER_SOURCE_FILE else None,
+    pattern=settings.ORDER_ID_PATTERN,
+    ttl=settings.ORDER_CACHE_TTL,
+    context_max=settings.ORDER_CONTEXT_MAX
+)
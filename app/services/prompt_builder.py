@@ -0,0 +1,151 @@
+import logging
+import threading
+from typing import Dict, Any, List, Tuple
+
+from app.services.conversation_summary import make_note
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """You are a friendly and helpful customer service agent for an e-commerce store. 
+Your goal is to assist customers with their inquiries in a professional, empathetic manner.
+
+KEY RESPONSE GUIDELINES:
+1. Be warm, friendly, and professional
+2. If you don't have specific order data, guide customers on how to find it
+3. For order status inquiries, ask for order number or email
+4. For product questions, be helpful but suggest checking the website for latest inventory
+5. Escalate to human agent for complex returns, complaints, or technical issues
+6. Always maintain brand voice - helpful, efficient, and caring
+
+COMMON SCENARIOS:
+- Order Status: "I'd be happy to check your order status! Do you have your order number or the email used for purchase?"
+- Product Info: "I can help with general product information! For specific inventory and pricing, our website has the most up-to-date details."
+- Shipping: "For shipping questions, I'll need your order number to look up the latest tracking information."
+- Returns: "For returns and exchanges, I'll connect you with our specialist team who can process this for you."
+- General Help: "I'm here to help! What can I assist you with today?"
+
+Always be honest about what information you have access to. If you need specific data from our systems, let the customer know what information you need to help them."""
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators per chat message
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate (~4 characters per token for English); no tokenizer dependency"""
+    return (len(text) + 3) // 4
+
+class PromptBuilder:
+    """
+    Assembles chat messages within an input token budget.
+
+    The static system prompt and its token count are computed once. History turns are
+    added newest-first while they fit; turns that don't fit (or are older than the history
+    window) are represented by the customer's rolling summary.
+    """
+
+    def __init__(self, system_prompt: str, token_budget: int):
+        self.system_prompt = system_prompt
+        self.system_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.total_tokens = 0
+        self.turns_included = 0
+        self.turns_dropped = 0
+        self.summaries_used = 0
+
+    def build(self, user_message: str, customer_context: Dict[str, Any] = None,
+              conversation_history: List[Dict] = None) -> List[Dict]:
+        context_section = self._context_section(customer_context)
+        used = self.system_tokens + estimate_tokens(context_section) \
+            + estimate_tokens(user_message) + MESSAGE_OVERHEAD_TOKENS
+
+        history, used, dropped = self._fit_history(conversation_history or [], self.token_budget - used, used)
+
+        summary = customer_context.get("conversation_summary") if customer_context else None
+        summary_section = ""
+        if summary:
+            summary_section = self._summary_section(summary, history, self.token_budget - used)
+            used += estimate_tokens(summary_section)
+
+        messages = [{"role": "system", "content": self.system_prompt + context_section + summary_section}]
+        messages.extend(history)
+        messages.append({"role": "user", "content": user_message})
+
+        with self._lock:
+            self.prompts += 1
+            self.total_tokens += used
+            self.turns_included += len(history) // 2
+            self.turns_dropped += dropped
+            self.summaries_used += 1 if summary_section else 0
+        return messages
+
+    def system_prompt_for(self, customer_context: Dict[str, Any] = None) -> str:
+        return self.system_prompt + self._context_section(customer_context)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "token_budget": self.token_budget,
+                "system_prompt_tokens": self.system_tokens,
+                "prompts": self.prompts,
+                "avg_prompt_tokens": round(self.total_tokens / self.prompts, 1) if self.prompts else 0.0,
+                "turns_included": self.turns_included,
+                "turns_dropped": self.turns_dropped,
+                "summaries_used": self.summaries_used
+            }
+
+    @staticmethod
+    def _context_section(customer_context: Dict[str, Any] = None) -> str:
+        if not customer_context:
+            return ""
+        section = "\n\nCUSTOMER CONTEXT:\n"
+        if customer_context.get('recent_orders'):
+            section += "- Orders (use these for order questions):\n"
+            section += "".join(f"  - {summary}\n" for summary in customer_context['recent_orders'])
+        if customer_context.get('customer_name'):
+            section += f"- Customer name: {customer_context['customer_name']}\n"
+        return section
+
+    @staticmethod
+    def _fit_history(history: List[Dict], available: int, used: int) -> Tuple[List[Dict], int, int]:
+        """Whole user/assistant turns, newest first, while they fit the remaining budget"""
+        turns = [history[i:i + 2] for i in range(0, len(history), 2)]
+        kept: List[List[Dict]] = []
+        for turn in reversed(turns):
+            cost = sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in turn)
+            if cost > available:
+                break
+            kept.append(turn)
+            available -= cost
+            used += cost
+        fitted = [message for turn in reversed(kept) for message in turn]
+        return fitted, used, len(turns) - len(kept)
+
+    @staticmethod
+    def _summary_section(summary: Dict[str, Any], history: List[Dict], available: int) -> str:
+        """Topics plus earlier customer messages that are not already in the included history"""
+        earlier = summary["turns"] - len(history) // 2
+        if earlier <= 0:
+            return ""
+        section = f"\nEARLIER CONVERSATION ({earlier} previous messages):\n"
+        topics = sorted(summary["intent_counts"].items(), key=lambda item: -item[1])
+        section += "- Topics: " + ", ".join(f"{intent} x{count}" for intent, count in topics) + "\n"
+        available -= estimate_tokens(section)
+        if available <= 0:
+            return section
+
+        included = {make_note(message["content"]) for message in history if message["role"] == "user"}
+        notes: List[str] = []
+        for note in reversed(summary["notes"]):
+            if note in included:
+                continue
+            line = f'- Customer said: "{note}"\n'
+            cost = estimate_tokens(line)
+            if cost > available:
+                break
+            notes.append(line)
+            available -= cost
+        return section + "".join(reversed(notes))
+
+# Global prompt builder instance
+prompt_builder = PromptBuilder(SYSTEM_PROMPT, token_budget=settings.PROMPT_TOKEN_BUDGET)
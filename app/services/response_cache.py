@@ -0,0 +1,191 @@
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# MinHash / LSH parameters: 32 hashes in 8 bands of 4 rows
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1234)  # fixed seed keeps signatures stable across restarts
+_HASH_PARAMS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_HASHES)
+]
+
+DIGIT_PATTERN = re.compile(r"\d")
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature over character shingles"""
+    padded = f" {text} "
+    shingles = {
+        zlib.crc32(padded[i:i + SHINGLE_SIZE].encode())
+        for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))
+    }
+    return tuple(
+        min((a * shingle + b) % MERSENNE_PRIME for shingle in shingles)
+        for a, b in _HASH_PARAMS
+    )
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_HASHES
+
+class ResponseCache:
+    """LRU cache of AI answers with exact and near-duplicate (MinHash/LSH) lookup"""
+
+    def __init__(self, max_entries: int, ttls: Dict[str, int], default_ttl: int, min_similarity: float):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._bands: Dict[tuple, set] = {}
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def make_key(self, user_message: str, intent: str, customer_context: Dict[str, Any] = None,
+                 conversation_history: List[Dict] = None) -> Optional[tuple]:
+        """Cache key, or None when the answer depends on this particular conversation"""
+        normalized = normalize_message(user_message)
+        if (not normalized or not settings.RESPONSE_CACHE_ENABLED
+                or self.ttls.get(intent, self.default_ttl) <= 0
+                or DIGIT_PATTERN.search(normalized)):
+            self._count_bypass()
+            return None
+        # The key covers only the message, so answers whose prompt carried this customer's
+        # earlier turns, summary or orders must never be shared
+        if conversation_history or (customer_context and (
+                customer_context.get("conversation_summary") or customer_context.get("recent_orders"))):
+            self._count_bypass()
+            return None
+        return (normalized, intent, self._context_shape(customer_context))
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return {**entry["result"], "cached": "exact"}
+
+            # Near-duplicate lookup: any shared LSH band makes a candidate
+            signature = minhash(key[0])
+            best_key, best_score = None, self.min_similarity
+            for band_key in self._band_keys(key, signature):
+                for candidate in self._bands.get(band_key, ()):
+                    candidate_entry = self._entries[candidate]
+                    if candidate_entry["expires"] <= now:
+                        continue
+                    score = similarity(signature, candidate_entry["signature"])
+                    if score >= best_score:
+                        best_key, best_score = candidate, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.near_hits += 1
+            return {**self._entries[best_key]["result"], "cached": "near"}
+
+    def put(self, key: tuple, result: Dict[str, Any], customer_context: Dict[str, Any] = None):
+        """Store a successful answer unless it is personalised"""
+        if result.get("confidence", 0) <= 0 or self._is_personal(result["response"], customer_context):
+            return
+        ttl = self.ttls.get(key[1], self.default_ttl)
+        signature = minhash(key[0])
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "result": dict(result),
+                "signature": signature,
+                "expires": time.monotonic() + ttl
+            }
+            for band_key in self._band_keys(key, signature):
+                self._bands.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, intent: Optional[str] = None) -> int:
+        """Drop every entry, or only those for one intent; returns the number removed"""
+        with self._lock:
+            keys = [key for key in self._entries if intent is None or key[1] == intent]
+            for key in keys:
+                self._remove(key)
+        logger.info(f"Invalidated {len(keys)} cached responses" + (f" for intent {intent}" if intent else ""))
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                "enabled": settings.RESPONSE_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 3) if lookups else 0.0
+            }
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        for band_key in self._band_keys(key, entry["signature"]):
+            bucket = self._bands.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._bands[band_key]
+
+    def _band_keys(self, key: tuple, signature: Tuple[int, ...]):
+        # Bands are scoped to intent and context shape so near-duplicates never cross them
+        return [(key[1], key[2], band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def _count_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    @staticmethod
+    def _context_shape(customer_context: Dict[str, Any] = None) -> tuple:
+        if not customer_context:
+            return ()
+        return (bool(customer_context.get("customer_name")), len(customer_context.get("recent_orders") or []))
+
+    @staticmethod
+    def _is_personal(response: str, customer_context: Dict[str, Any] = None) -> bool:
+        """Answers that address the customer by name must not be shared"""
+        if not customer_context or not customer_context.get("customer_name"):
+            return False
+        response_lower = response.lower()
+        return any(
+            len(part) > 2 and part in response_lower
+            for part in customer_context["customer_name"].lower().split()
+        )
+
+# Global response cache instance
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttls=settings.RESPONSE_CACHE_TTLS,
+    default_ttl=settings.RESPONSE_CACHE_DEFAULT_TTL,
+    min_similarity=settings.RESPONSE_CACHE_MIN_SIMILARITY
+)
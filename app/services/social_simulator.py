@@ -1,72 +1,125 @@
 import logging
 import random
 import time
+from collections import OrderedDict, deque
 from typing import Dict, List, Optional
 from datetime import datetime
 
+from config.settings import settings
+
 logger = logging.getLogger(__name__)
 
+PLATFORMS = ("instagram", "whatsapp")
+PLATFORM_PREFIXES = {"instagram": "ig", "whatsapp": "wa"}
+
+# Common customer questions
+QUESTIONS = [
+    "Where is my order #ORD12345?",
+    "Do you have this in blue?",
+    "What's your return policy?",
+    "How long does shipping take?",
+    "Do you ship to Canada?",
+    "My order arrived damaged, what should I do?",
+    "What's the estimated delivery time?",
+    "Can I change my shipping address?",
+    "Do you have size guides?",
+    "Is this product in stock?"
+]
+
+FIRST_NAMES = ["Sarah", "Mike", "Alex", "David", "Priya", "Tom", "Lena", "Omar", "Julia", "Ken", "Ana", "Sam"]
+LAST_INITIALS = "ABCDEFGHJKLMNPRSTW"
+AVATARS = ["👩‍💼", "👨‍💻", "👩‍🎨", "👨‍🔧", "🧑‍🎓", "👩‍🍳", "🧑‍🚀", "👨‍🏫"]
+
 class SocialSimulator:
-    """Simulate Instagram & WhatsApp for investor demos"""
-    
-    def __init__(self):
-        self.conversations = {}
+    """
+    Simulate Instagram & WhatsApp for investor demos and local load tests.
+
+    Memory stays flat however long it runs: each user's history is a ring buffer of the
+    last history_per_user messages, only the max_conversations most recently active users
+    are tracked (LRU), and dashboard figures are running counters updated on append.
+    """
+
+    def __init__(self, synthetic_users: int = 0, seed: Optional[int] = None,
+                 max_conversations: int = 1000, history_per_user: int = 50):
+        self.max_conversations = max_conversations
+        self.history_per_user = history_per_user
+        self.conversations: "OrderedDict[str, deque]" = OrderedDict()
+        self._evicted_users: set = set()  # so a returning evicted user isn't counted as a new conversation
+        self.total_messages = 0
+        self.messages_by_platform: Dict[str, int] = {}
+        self.messages_by_type: Dict[str, int] = {"customer": 0, "ai": 0}
+        self.messages_by_intent: Dict[str, int] = {}
+        self._minutes: deque = deque(maxlen=60)  # [minute, messages] for the last hour
         self.demo_users = [
             {"id": "ig_customer_001", "name": "Sarah M.", "platform": "instagram", "avatar": "👩‍💼"},
             {"id": "wa_customer_002", "name": "Mike T.", "platform": "whatsapp", "avatar": "👨‍💻"},
             {"id": "ig_customer_003", "name": "Alex J.", "platform": "instagram", "avatar": "👩‍🎨"},
             {"id": "wa_customer_004", "name": "David L.", "platform": "whatsapp", "avatar": "👨‍🔧"}
         ]
-    
-    def simulate_incoming_message(self, platform: str = None) -> Dict:
-        """Simulate a customer sending a message"""
+        # Users indexed by id, plus per-platform lists for random picks
+        self.users: Dict[str, Dict] = {}
+        self.users_by_platform: Dict[str, List[Dict]] = {platform: [] for platform in PLATFORMS}
+        for user in self.demo_users:
+            self._add_user(user)
+        self.add_synthetic_users(synthetic_users, seed)
+
+    def add_synthetic_users(self, count: int, seed: Optional[int] = None):
+        """Generate `count` more users (deterministic for a given seed)"""
+        rng = random.Random(seed)
+        start = len(self.users)
+        for number in range(start, start + count):
+            platform = PLATFORMS[number % len(PLATFORMS)]
+            self._add_user({
+                "id": f"{PLATFORM_PREFIXES[platform]}_sim_{number:06d}",
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_INITIALS)}.",
+                "platform": platform,
+                "avatar": rng.choice(AVATARS)
+            })
+
+    def _add_user(self, user: Dict):
+        self.users[user["id"]] = user
+        self.users_by_platform.setdefault(user["platform"], []).append(user)
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        return self.users.get(user_id)
+
+    def pick_user(self, platform: str = None, rng: random.Random = random) -> Dict:
         if not platform:
-            platform = random.choice(["instagram", "whatsapp"])
-        
-        user = random.choice([u for u in self.demo_users if u["platform"] == platform])
-        
-        # Common customer questions
-        questions = [
-            "Where is my order #ORD12345?",
-            "Do you have this in blue?",
-            "What's your return policy?",
-            "How long does shipping take?",
-            "Do you ship to Canada?",
-            "My order arrived damaged, what should I do?",
-            "What's the estimated delivery time?",
-            "Can I change my shipping address?",
-            "Do you have size guides?",
-            "Is this product in stock?"
-        ]
-        
+            platform = rng.choice(PLATFORMS)
+        return rng.choice(self.users_by_platform[platform])
+
+    def simulate_incoming_message(self, platform: str = None, user_id: str = None, text: str = None) -> Dict:
+        """Simulate a customer sending a message (a random user and question unless given)"""
+        user = self.users.get(user_id) if user_id else None
+        if user is None:
+            user = self.pick_user(platform)
+
         message = {
-            "platform": platform,
+            "platform": user["platform"],
             "user_id": user["id"],
             "user_name": user["name"],
             "user_avatar": user["avatar"],
-            "message": random.choice(questions),
+            "message": text or random.choice(QUESTIONS),
             "timestamp": datetime.now().isoformat(),
             "simulated": True
         }
-        
+
         # Store in conversation history
-        if user["id"] not in self.conversations:
-            self.conversations[user["id"]] = []
-        self.conversations[user["id"]].append({
+        self._append(user, {
             "type": "customer",
             "message": message["message"],
             "timestamp": message["timestamp"]
         })
-        
-        logger.info(f"[SIM] {user['avatar']} {user['name']} ({platform}): {message['message']}")
+
+        logger.debug(f"[SIM] {user['avatar']} {user['name']} ({user['platform']}): {message['message']}")
         return message
-    
-    def simulate_ai_response(self, user_id: str, ai_response: str) -> Dict:
+
+    def simulate_ai_response(self, user_id: str, ai_response: str, intent: Optional[str] = None) -> Dict:
         """Simulate AI sending response back"""
-        user = next((u for u in self.demo_users if u["id"] == user_id), None)
+        user = self.users.get(user_id)
         if not user:
             user = {"id": user_id, "name": "Customer", "platform": "unknown", "avatar": "👤"}
-        
+
         response = {
             "platform": user["platform"],
             "user_id": user["id"],
@@ -76,34 +129,83 @@ class SocialSimulator:
             "timestamp": datetime.now().isoformat(),
             "simulated": True
         }
-        
+
         # Store AI response
         if user["id"] in self.conversations:
-            self.conversations[user["id"]].append({
+            self._append(user, {
                 "type": "ai",
                 "message": ai_response,
                 "timestamp": response["timestamp"]
             })
-        
-        logger.info(f"[SIM] 🤖 AI ({user['platform']}): {ai_response[:50]}...")
+            if intent:
+                self.messages_by_intent[intent] = self.messages_by_intent.get(intent, 0) + 1
+
+        logger.debug(f"[SIM] 🤖 AI ({user['platform']}): {ai_response[:50]}...")
         return response
-    
+
+    def _append(self, user: Dict, entry: Dict):
+        """Add to the user's ring buffer (evicting the least recently active user if over the cap)"""
+        history = self.conversations.get(user["id"])
+        if history is None:
+            history = self.conversations[user["id"]] = deque(maxlen=self.history_per_user)
+            self._evicted_users.discard(user["id"])
+            if len(self.conversations) > self.max_conversations:
+                evicted_id, _ = self.conversations.popitem(last=False)
+                self._evicted_users.add(evicted_id)
+        else:
+            self.conversations.move_to_end(user["id"])
+        history.append(entry)
+
+        self.total_messages += 1
+        self.messages_by_type[entry["type"]] += 1
+        self.messages_by_platform[user["platform"]] = self.messages_by_platform.get(user["platform"], 0) + 1
+        minute = int(time.time() // 60)
+        if self._minutes and self._minutes[-1][0] == minute:
+            self._minutes[-1][1] += 1
+        else:
+            self._minutes.append([minute, 1])
+
     def get_conversation_history(self, user_id: str) -> List[Dict]:
-        """Get simulated conversation history"""
-        return self.conversations.get(user_id, [])
-    
+        """Get simulated conversation history (the last history_per_user messages)"""
+        return list(self.conversations.get(user_id, ()))
+
+    def recent_activity(self, limit: int = 3) -> List[Dict]:
+        """The most recently active users with their last message"""
+        activity = []
+        for user_id in reversed(self.conversations):
+            if len(activity) >= limit:
+                break
+            history = self.conversations[user_id]
+            activity.append({
+                "user": self.users.get(user_id, {"id": user_id}),
+                "last_message": history[-1]["message"],
+                "message_count": len(history)
+            })
+        return activity
+
     def get_demo_statistics(self) -> Dict:
-        """Get demo statistics for investor dashboard"""
-        total_messages = sum(len(conv) for conv in self.conversations.values())
+        """Get demo statistics for investor dashboard (running counters - constant time)"""
+        current_minute = int(time.time() // 60)
         return {
-            "total_conversations": len(self.conversations),
-            "total_messages": total_messages,
-            "platforms": {
-                "instagram": len([u for u in self.demo_users if u["platform"] == "instagram"]),
-                "whatsapp": len([u for u in self.demo_users if u["platform"] == "whatsapp"])
-            },
+            "total_conversations": len(self.conversations) + len(self._evicted_users),
+            "tracked_conversations": len(self.conversations),
+            "total_messages": self.total_messages,
+            "messages_by_type": dict(self.messages_by_type),
+            "messages_by_platform": dict(self.messages_by_platform),
+            "messages_by_intent": dict(self.messages_by_intent),
+            "messages_per_minute": [
+                {"minutes_ago": current_minute - minute, "messages": count}
+                for minute, count in self._minutes if current_minute - minute < 60
+            ],
+            "platforms": {platform: len(users) for platform, users in self.users_by_platform.items()},
+            "simulated_users": len(self.users),
             "active_demo_users": self.demo_users
         }
 
 # Global simulator instance
-social_simulator = SocialSimulator()
\ No newline at end of file
+social_simulator = SocialSimulator(
+    synthetic_users=settings.SIMULATOR_USERS,
+    seed=0,
+    max_conversations=settings.SIMULATOR_MAX_CONVERSATIONS,
+    history_per_user=settings.SIMULATOR_HISTORY_PER_USER
+)
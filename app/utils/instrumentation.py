@@ -0,0 +1,136 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+from sqlalchemy import event
+
+from app.utils.metrics import metrics
+
+# Counters for the request being handled; None outside a request (CLI scripts, background threads)
+_request_counters: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_counters", default=None)
+
+class EndpointCounters:
+    """Per-endpoint totals of the per-request counters (e.g. PII decrypts per chat message)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, float]] = {}
+        self._totals: Dict[str, float] = {}
+
+    def record(self, endpoint: str, counters: Dict[str, float]):
+        with self._lock:
+            totals = self._endpoints.setdefault(endpoint, {"requests": 0})
+            totals["requests"] += 1
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+
+    def add_total(self, name: str, value: int):
+        with self._lock:
+            self._totals[name] = self._totals.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {}
+            for endpoint, totals in self._endpoints.items():
+                requests = totals["requests"]
+                endpoints[endpoint] = {
+                    **{name: round(value, 3) for name, value in totals.items()},
+                    **{f"{name}_per_request": round(value / requests, 3)
+                       for name, value in totals.items() if name != "requests"}
+                }
+            return {"totals": {name: round(value, 3) for name, value in self._totals.items()}, "endpoints": endpoints}
+
+endpoint_counters = EndpointCounters()
+
+def count(name: str, value: float = 1):
+    """Add to a counter for the current request (and the process-wide total)"""
+    counters = _request_counters.get()
+    if counters is not None:
+        counters[name] = counters.get(name, 0) + value
+    endpoint_counters.add_total(name, value)
+
+def current_counters() -> Dict[str, float]:
+    return dict(_request_counters.get() or {})
+
+@contextmanager
+def span(stage: str):
+    """Time one pipeline stage: adds <stage>_ms to the request and feeds the stage histogram"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        count(f"{stage}_ms", elapsed * 1000)
+        metrics.observe("chat_stage_duration_seconds", elapsed, stage=stage)
+
+def server_timing(counters: Dict[str, float], total_ms: float) -> str:
+    """Server-Timing header value from the request's *_ms counters"""
+    entries = [f"{name[:-3]};dur={value:.1f}" for name, value in counters.items() if name.endswith("_ms")]
+    if "db_queries" in counters:
+        entries.append(f'db_queries;desc="{int(counters["db_queries"])}"')
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+def instrument_engine(engine):
+    """Count queries and database time (db_queries, db_ms) against the current request"""
+    # The start time lives on the statement's execution context, not on the connection:
+    # after_cursor_execute never runs for a failed statement, and the context goes with it
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        count("db_queries")
+        count("db_ms", (time.perf_counter() - started) * 1000)
+        metrics.inc("db_queries_total")
+
+class RequestCounterMiddleware:
+    """
+    ASGI middleware giving every HTTP request its own counters.
+
+    Pure ASGI (not BaseHTTPMiddleware) so work done while a streaming body is sent is
+    still attributed to the request. Totals are keyed by route template, e.g. "POST /ai/chat".
+    With server_timing on, the counters gathered before the response starts are returned in
+    a Server-Timing header (for streams that is everything up to the first byte).
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        counters: Dict[str, float] = {}
+        token = _request_counters.set(counters)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    value = server_timing(counters, (time.perf_counter() - started) * 1000)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", value.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_counters.reset(token)
+            route = scope.get("route")
+            endpoint = f"{scope['method']} {route.path if route is not None else 'unmatched'}"
+            endpoint_counters.record(endpoint, counters)
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - started,
+                            endpoint=endpoint, status=str(status))
+            metrics.observe("http_request_db_queries", counters.get("db_queries", 0), endpoint=endpoint)
@@ -0,0 +1,32 @@
+from typing import Any, Callable, Dict
+
+class LazyContext(dict):
+    """
+    A dict whose expensive entries are computed on first read.
+
+    Unread lazy keys are not stored, so iterating or serializing the context (cache keys,
+    logs) never triggers them - only an explicit ``context["key"]`` / ``.get("key")`` does.
+    """
+
+    def __init__(self, values: Dict[str, Any], lazy: Dict[str, Callable[[], Any]]):
+        super().__init__(values)
+        self._lazy = dict(lazy)
+
+    def _resolve(self, key: str):
+        loader = self._lazy.pop(key)
+        value = loader()
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __getitem__(self, key):
+        if key in self._lazy:
+            return self._resolve(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key in self._lazy:
+            return self._resolve(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key in self._lazy or super().__contains__(key)
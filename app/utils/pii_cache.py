@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from config.security import encryptor
+from config.settings import settings
+from app.utils.instrumentation import count, span
+
+class PlaintextCache:
+    """
+    Small TTL'd LRU of decrypted PII, keyed by ciphertext.
+
+    Keying by ciphertext means a changed email/phone is simply a different entry, so there
+    is nothing to invalidate. Plaintext is held in a bytearray that is overwritten with zeros
+    on eviction or expiry (best effort: str copies handed to callers are not reachable).
+    """
+
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytearray]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def decrypt(self, ciphertext: Optional[str]) -> str:
+        if not ciphertext:
+            return ""
+        if self.enabled:
+            with self._lock:
+                entry = self._entries.get(ciphertext)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(ciphertext)
+                    self.hits += 1
+                    return entry[1].decode()
+                self.misses += 1
+
+        with span("decrypt"):
+            plaintext = encryptor.decrypt(ciphertext)
+        count("pii_decrypts")
+        if self.enabled:
+            self._store(ciphertext, plaintext)
+        return plaintext
+
+    def _store(self, ciphertext: str, plaintext: str):
+        now = time.monotonic()
+        with self._lock:
+            old = self._entries.pop(ciphertext, None)
+            if old is not None:
+                _zero(old[1])
+            self._entries[ciphertext] = (now + self.ttl, bytearray(plaintext.encode()))
+            # Drop from the LRU end while over capacity or expired (LRU order roughly tracks expiry)
+            while self._entries:
+                oldest_key, (expires_at, value) = next(iter(self._entries.items()))
+                if len(self._entries) <= self.max_entries and expires_at > now:
+                    break
+                del self._entries[oldest_key]
+                _zero(value)
+
+    def clear(self):
+        with self._lock:
+            for _, value in self._entries.values():
+                _zero(value)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+def _zero(buffer: bytearray):
+    buffer[:] = bytes(len(buffer))
+
+# Global plaintext cache used by Customer.get_email / get_phone
+pii_cache = PlaintextCache(
+    max_entries=settings.PII_CACHE_MAX_ENTRIES,
+    ttl=settings.PII_CACHE_TTL,
+    enabled=settings.PII_CACHE_ENABLED
+)
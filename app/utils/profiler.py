@@ -0,0 +1,166 @@
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames of threads that are parked, not working: the event loop waiting on sockets
+# (uvloop's loop is C, so only asyncio's run() is visible), idle pool workers
+IDLE_FRAMES = {("selectors.py", "select"), ("runners.py", "run"), ("threading.py", "wait"),
+               ("queue.py", "get"), ("thread.py", "_worker")}
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack at a fixed interval into folded stacks.
+
+    Output is the "frame;frame;frame count" format read by flamegraph.pl and speedscope.
+    The whole process is sampled (the request's handler may run on the event loop or in a
+    pool thread), so stacks are rooted at the thread name and parked threads are skipped.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {hits}\n" for stack, hits in self._stacks.most_common())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+class ProfileRing:
+    """Keeps the newest max_files profiles in a directory, deleting the oldest beyond that"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def write(self, profile_id: str, folded: str):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+                f.write(folded)
+            for stale in self._files()[:-self.max_files]:
+                os.remove(os.path.join(self.directory, stale))
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"id": name[:-len(".folded")], "bytes": os.path.getsize(os.path.join(self.directory, name))}
+                for name in reversed(self._files())
+            ]
+
+    def read(self, profile_id: str) -> Optional[str]:
+        if _UNSAFE_NAME.search(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.folded")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".folded"))  # ids sort by time
+
+class ProfilerMiddleware:
+    """
+    Runs selected requests under the sampling profiler and stores the result in the ring.
+
+    A request is profiled when it carries the admin token (X-Profile header or ?profile=)
+    or is picked by random sampling at sample_rate. Explicit requests get the stored
+    profile's id back in an X-Profile-Id header. One profile runs at a time. Only installed
+    when profiling is enabled, so a disabled profiler costs nothing.
+    """
+
+    def __init__(self, app, ring: ProfileRing, admin_token: str = "", sample_rate: float = 0.0,
+                 interval: float = 0.005, exclude_prefix: str = "/admin/profiles"):
+        self.app = app
+        self.ring = ring
+        self.exclude_prefix = exclude_prefix
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefix):
+            await self.app(scope, receive, send)
+            return
+        explicit = is_admin(self.admin_token, request_token(scope))
+        if not (explicit or (self.sample_rate and random.random() < self.sample_rate)):
+            await self.app(scope, receive, send)
+            return
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)  # another request is being profiled
+            return
+
+        trigger = "explicit" if explicit else "sampled"
+        profile_id = _UNSAFE_NAME.sub("_", f"{time.time_ns()}-{trigger}-{scope['method']}{scope['path']}")
+
+        async def send_wrapper(message):
+            if explicit and message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            folded = profiler.stop()
+            self._busy.release()
+            # Sampled requests that finished before the first sample aren't worth a file
+            if folded or explicit:
+                self.ring.write(profile_id, folded)
+                logger.info(f"Stored {trigger} profile {profile_id}: {profiler.samples} samples "
+                            f"over {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def request_token(scope) -> Optional[str]:
+    """Admin token from the X-Profile header or the ?profile= query parameter"""
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value.decode("latin-1")
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile")
+    return values[0] if values else None
+
+def is_admin(admin_token: str, token: Optional[str]) -> bool:
+    # No configured token means explicit profiling is off, never "any token"
+    return bool(admin_token) and token is not None and hmac.compare_digest(token.encode(), admin_token.encode())
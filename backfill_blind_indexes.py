@@ -0,0 +1,26 @@
+import argparse
+import logging
+
+from app.models.database import secure_session
+from app.services.customer_lookup import backfill_blind_indexes
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill email/phone blind-index columns for existing customers")
+    parser.add_argument("--batch-size", type=int, default=1000, help="customers per committed batch")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every row (after changing BLIND_INDEX_KEY)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Importing the models adds the new columns and their indexes to an existing database
+    db = secure_session.SessionLocal()
+    try:
+        result = backfill_blind_indexes(db, batch_size=args.batch_size, rebuild=args.rebuild)
+    finally:
+        db.close()
+
+    print("=" * 50)
+    print(f"Backfilled {result['updated']} customers in {result['seconds']}s ({result['failed']} undecryptable)")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Local SQLite concurrency benchmark for the storage profiles.
+
+Runs writer threads (one conversation insert + commit each, like _save_conversation)
+alongside reader threads (the history window query) against a fresh database file
+for each profile and prints throughput and lock errors.
+
+    python -m benchmarks.db_concurrency --seconds 10 --writers 8 --readers 8
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import settings
+from app.models.database import Base, Conversation
+from app.models.storage_profile import build_engine, describe_storage
+
+CUSTOMERS = 500
+
+def run_profile(profile: str, seconds: float, writers: int, readers: int) -> dict:
+    directory = tempfile.mkdtemp(prefix="db-bench-")
+    profile_settings = settings.model_copy(update={
+        "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        "STORAGE_PROFILE": profile
+    })
+    engine, report = build_engine(profile_settings)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            db = Session()
+            try:
+                db.add(Conversation(
+                    customer_id=random.randint(1, CUSTOMERS), platform="instagram",
+                    message_text="Where is my order?", ai_response="Let me check that for you!" * 4,
+                    intent="order_status", requires_human=False
+                ))
+                db.commit()
+                key = "writes"
+            except OperationalError:
+                db.rollback()
+                key = "errors"
+            finally:
+                db.close()
+            with lock:
+                counts[key] += 1
+
+    def reader():
+        while not stop.is_set():
+            db = Session()
+            try:
+                db.execute(
+                    select(Conversation.message_text, Conversation.ai_response)
+                    .where(Conversation.customer_id == random.randint(1, CUSTOMERS))
+                    .order_by(Conversation.created_at.desc()).limit(10)
+                ).all()
+                key = "reads"
+            except OperationalError:
+                key = "errors"
+            finally:
+                db.close()
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    journal_mode = describe_storage(engine, report)["effective"].get("journal_mode")
+    engine.dispose()
+    return {
+        "profile": profile,
+        "journal_mode": journal_mode,
+        "writes_per_sec": round(counts["writes"] / seconds, 1),
+        "reads_per_sec": round(counts["reads"] / seconds, 1),
+        "lock_errors": counts["errors"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite throughput under the storage profiles")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    results = [run_profile(profile, args.seconds, args.writers, args.readers) for profile in ("default", "tuned")]
+
+    print("=" * 72)
+    print(f"{'profile':<10}{'journal':<10}{'writes/s':>14}{'reads/s':>14}{'lock errors':>14}")
+    print("-" * 72)
+    for result in results:
+        print(f"{result['profile']:<10}{result['journal_mode']:<10}{result['writes_per_sec']:>14}"
+              f"{result['reads_per_sec']:>14}{result['lock_errors']:>14}")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Local Groq/OpenAI-compatible stand-in for load testing without spending API quota.
+
+Serves POST /openai/v1/chat/completions (plain and streaming) with a configurable
+latency distribution, error rate, per-model rate limits (x-ratelimit-* headers and
+429 + Retry-After) and decommissioned models. Point the app at it with
+GROQ_BASE_URL=http://127.0.0.1:9100/openai/v1.
+
+    python -m benchmarks.fake_groq --port 9100 --latency lognormal:0.4:0.5 --error-rate 0.01 --rpm 600
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Dict, Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ("thanks for reaching out happy to help with your order shipping usually takes three "
+         "to five business days you can track it from the link in your confirmation email").split()
+
+def parse_latency(spec: str):
+    """fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA (seconds) -> sampler"""
+    kind, *values = spec.split(":")
+    numbers = [float(value) for value in values]
+    if kind == "fixed":
+        return lambda: numbers[0]
+    if kind == "uniform":
+        return lambda: random.uniform(numbers[0], numbers[1])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(numbers[0]), numbers[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+class Quota:
+    """Continuously refilling bucket, reported the way Groq does"""
+
+    def __init__(self, per_minute: int):
+        self.limit = per_minute
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def take(self, amount: float) -> Optional[float]:
+        """None when taken, otherwise seconds until enough is available"""
+        now = time.monotonic()
+        self.level = min(self.limit, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.level >= amount:
+            self.level -= amount
+            return None
+        return (amount - self.level) / self.rate
+
+    def reset_in(self) -> str:
+        return f"{(self.limit - self.level) / self.rate:.2f}s"
+
+def create_app(options: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Groq stand-in")
+    sample_latency = parse_latency(options.latency)
+    decommissioned = set(filter(None, options.decommissioned.split(",")))
+    quotas: Dict[str, Dict[str, Quota]] = {}
+    stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "decommissioned": 0}
+
+    def rate_limit_headers(model: str) -> Dict[str, str]:
+        headers = {}
+        for kind, quota in quotas.get(model, {}).items():
+            headers[f"x-ratelimit-limit-{kind}"] = str(quota.limit)
+            headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, int(quota.level)))
+            headers[f"x-ratelimit-reset-{kind}"] = quota.reset_in()
+        return headers
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body["model"]
+        stats["requests"] += 1
+
+        if model in decommissioned:
+            stats["decommissioned"] += 1
+            return JSONResponse({"error": {"code": "model_decommissioned",
+                                           "message": f"The model {model} has been decommissioned"}}, status_code=400)
+
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        completion_tokens = options.response_tokens
+        model_quotas = quotas.setdefault(model, {
+            **({"requests": Quota(options.rpm)} if options.rpm else {}),
+            **({"tokens": Quota(options.tpm)} if options.tpm else {})
+        })
+        waits = [wait for wait in (
+            model_quotas["requests"].take(1) if "requests" in model_quotas else None,
+            model_quotas["tokens"].take(prompt_tokens + completion_tokens) if "tokens" in model_quotas else None
+        ) if wait is not None]
+        if waits:
+            stats["rate_limited"] += 1
+            return JSONResponse({"error": {"code": "rate_limit_exceeded", "message": "Rate limit reached"}},
+                                status_code=429,
+                                headers={**rate_limit_headers(model), "retry-after": f"{max(waits):.2f}"})
+
+        await asyncio.sleep(sample_latency())
+        if random.random() < options.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Internal server error"}}, status_code=500)
+
+        words = [random.choice(WORDS) for _ in range(completion_tokens)]
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        stats["ok"] += 1
+
+        if body.get("stream"):
+            async def chunks():
+                for word in words:
+                    yield "data: " + json.dumps({"choices": [{"delta": {"content": word + " "}}]}) + "\n\n"
+                    await asyncio.sleep(options.chunk_delay)
+                yield "data: " + json.dumps({"choices": [{"delta": {}}], "x_groq": {"usage": usage}}) + "\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream", headers=rate_limit_headers(model))
+
+        return JSONResponse({
+            "id": f"chatcmpl-{stats['requests']}",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+            "usage": usage
+        }, headers=rate_limit_headers(model))
+
+    @app.get("/stats")
+    async def get_stats() -> Dict[str, Any]:
+        return stats
+
+    return app
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Groq-compatible stand-in server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="lognormal:0.4:0.4",
+                        help="fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA (time to full answer / first token)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute per model (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute per model (0 = unlimited)")
+    parser.add_argument("--decommissioned", default="", help="comma-separated models that answer model_decommissioned")
+    parser.add_argument("--response-tokens", type=int, default=60)
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="seconds between streamed chunks")
+    return parser
+
+def main():
+    options = build_parser().parse_args()
+    uvicorn.run(create_app(options), host=options.host, port=options.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
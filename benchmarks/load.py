@@ -0,0 +1,293 @@
+"""
+End-to-end load benchmark for the chat endpoints.
+
+Drives /ai/chat, /ai/chat/batch or /ai/chat/stream with closed-loop workers at each
+concurrency level and reports p50/p95/p99 latency, requests/sec and the server-side
+split of database time vs LLM time per request (from /instrumentation/endpoints).
+Each run is appended to benchmarks/results/history.jsonl and compared with the previous
+run of the same label, mode and concurrency.
+
+    # Start the Groq stand-in and the app on a scratch database, then benchmark them
+    python -m benchmarks.load --spawn --concurrency 1,16,64 --requests 300
+
+    # Against an already running app (pointed at benchmarks.fake_groq via GROQ_BASE_URL)
+    python -m benchmarks.load --url http://127.0.0.1:8000 --mode stream
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from config.settings import PROJECT_ROOT
+
+RESULTS_FILE = os.path.join(PROJECT_ROOT, "benchmarks", "results", "history.jsonl")
+ENDPOINTS = {"chat": "POST /ai/chat", "batch": "POST /ai/chat/batch", "stream": "GET /ai/chat/stream"}
+SERVER_COUNTERS = ("db_ms", "db_queries", "llm_ms", "llm_queue_ms")
+
+MESSAGES = [
+    "Hi! Where is my order? I ordered last week",
+    "Do you have the blue t-shirt in size M?",
+    "How long does shipping take to Canada?",
+    "I want to return my jacket, it doesn't fit",
+    "Can you tell me more about the linen shirts?",
+    "My package says delivered but I never got it",
+    "What's your return policy for sale items?",
+    "Is the black hoodie back in stock?",
+    "thanks so much for the help!",
+    "Can I change the address on my order?",
+]
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def send_chat(client: httpx.AsyncClient, customer: str, args) -> Dict[str, Any]:
+    response = await client.post("/ai/chat", params={"message": random.choice(MESSAGES), "social_media_id": customer})
+    response.raise_for_status()
+    return {}
+
+async def send_batch(client: httpx.AsyncClient, customer: str, args) -> Dict[str, Any]:
+    items = [{"social_media_id": f"{customer}-{index % 5}", "message": random.choice(MESSAGES)}
+             for index in range(args.batch_size)]
+    response = await client.post("/ai/chat/batch", json={"items": items})
+    response.raise_for_status()
+    return {}
+
+async def send_stream(client: httpx.AsyncClient, customer: str, args) -> Dict[str, Any]:
+    started = time.perf_counter()
+    first_token = None
+    async with client.stream("GET", "/ai/chat/stream",
+                             params={"message": random.choice(MESSAGES), "social_media_id": customer}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line.startswith("data:"):
+                first_token = time.perf_counter() - started
+            if line.startswith("event: done"):
+                break
+    return {"ttft": first_token}
+
+SENDERS = {"chat": send_chat, "batch": send_batch, "stream": send_stream}
+
+async def run_level(url: str, mode: str, concurrency: int, requests: int, args) -> Dict[str, Any]:
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    errors = 0
+    remaining = requests
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        before = await server_counters(client, mode)
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                customer = f"bench-{random.randrange(args.customers)}"
+                started = time.perf_counter()
+                try:
+                    extra = await SENDERS[mode](client, customer, args)
+                except (httpx.HTTPError, ValueError):
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if extra.get("ttft") is not None:
+                    first_tokens.append(extra["ttft"])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        after = await server_counters(client, mode)
+
+    result = {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {name: round(percentile(latencies, fraction) * 1000, 1)
+                       for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "server_per_request": server_delta(before, after)
+    }
+    if first_tokens:
+        result["ttft_ms"] = {name: round(percentile(first_tokens, fraction) * 1000, 1)
+                             for name, fraction in (("p50", 0.5), ("p95", 0.95))}
+    return result
+
+async def server_counters(client: httpx.AsyncClient, mode: str) -> Optional[Dict[str, float]]:
+    try:
+        response = await client.get("/instrumentation/endpoints")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None  # older server without the counters endpoint
+    return response.json()["endpoints"].get(ENDPOINTS[mode], {})
+
+def server_delta(before: Optional[Dict[str, float]], after: Optional[Dict[str, float]]) -> Dict[str, float]:
+    if before is None or after is None:
+        return {}
+    requests = after.get("requests", 0) - before.get("requests", 0)
+    if requests <= 0:
+        return {}
+    return {name: round((after.get(name, 0) - before.get(name, 0)) / requests, 2) for name in SERVER_COUNTERS}
+
+def load_previous(label: str) -> Dict[tuple, Dict[str, Any]]:
+    """Latest stored result per (mode, concurrency) for this label"""
+    previous = {}
+    if not os.path.exists(RESULTS_FILE):
+        return previous
+    with open(RESULTS_FILE) as history:
+        for line in history:
+            run = json.loads(line)
+            if run["label"] == label:
+                for result in run["results"]:
+                    previous[(result["mode"], result["concurrency"])] = result
+    return previous
+
+def find_regressions(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float) -> List[str]:
+    if baseline is None:
+        return []
+    regressions = []
+    if result["latency_ms"]["p95"] > baseline["latency_ms"]["p95"] * (1 + tolerance):
+        regressions.append(f"p95 {baseline['latency_ms']['p95']} -> {result['latency_ms']['p95']} ms")
+    if result["rps"] < baseline["rps"] * (1 - tolerance):
+        regressions.append(f"rps {baseline['rps']} -> {result['rps']}")
+    if result["errors"] > baseline["errors"]:
+        regressions.append(f"errors {baseline['errors']} -> {result['errors']}")
+    return regressions
+
+def save_run(label: str, args, results: List[Dict[str, Any]]):
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    run = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "label": label,
+        "config": {"fake": args.fake_args if args.spawn else None, "customers": args.customers,
+                   "batch_size": args.batch_size, "requests": args.requests},
+        "results": results
+    }
+    with open(RESULTS_FILE, "a") as history:
+        history.write(json.dumps(run) + "\n")
+
+def spawn_stack(args) -> List[subprocess.Popen]:
+    """Start the Groq stand-in and the app (scratch SQLite database) as subprocesses"""
+    scratch = tempfile.mkdtemp(prefix="load-bench-")
+    env = {
+        **os.environ,
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.fake_port}/openai/v1",
+        "GROQ_API_KEY": "bench",
+        "GROQ_HTTP2": "false",
+        "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+        "DEMO_ENABLED": "true"
+    }
+    if "ENCRYPTION_KEY" not in os.environ:
+        from cryptography.fernet import Fernet
+        env["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.fake_groq", "--port", str(args.fake_port),
+                          *shlex.split(args.fake_args)], cwd=PROJECT_ROOT, env=env),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port),
+                          "--log-level", "warning"], cwd=PROJECT_ROOT, env=env,
+                         stdout=open(os.path.join(scratch, "app.log"), "w"), stderr=subprocess.STDOUT)
+    ]
+    for url in (f"http://127.0.0.1:{args.fake_port}/stats", f"http://127.0.0.1:{args.app_port}/health"):
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(url, timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or any(process.poll() is not None for process in processes):
+                    stop_stack(processes)
+                    raise RuntimeError(f"{url} did not come up (logs in {scratch})")
+                time.sleep(0.2)
+    print(f"Spawned stand-in on :{args.fake_port} and app on :{args.app_port} (scratch data in {scratch})")
+    return processes
+
+def stop_stack(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def print_results(results: List[Dict[str, Any]], regressions: Dict[int, List[str]]):
+    print("=" * 104)
+    print(f"{'mode':<8}{'conc':>6}{'reqs':>7}{'errs':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'db ms':>9}{'llm ms':>9}{'queue ms':>10}  regressions")
+    print("-" * 104)
+    for index, result in enumerate(results):
+        server = result["server_per_request"]
+        print(f"{result['mode']:<8}{result['concurrency']:>6}{result['requests']:>7}{result['errors']:>6}"
+              f"{result['rps']:>9}{result['latency_ms']['p50']:>10}{result['latency_ms']['p95']:>10}"
+              f"{result['latency_ms']['p99']:>10}{server.get('db_ms', '-'):>9}{server.get('llm_ms', '-'):>9}"
+              f"{server.get('llm_queue_ms', '-'):>10}  {'; '.join(regressions.get(index, [])) or '-'}")
+    print("=" * 104)
+    for result in results:
+        if "ttft_ms" in result:
+            print(f"Time to first token at concurrency {result['concurrency']}: "
+                  f"p50 {result['ttft_ms']['p50']} ms, p95 {result['ttft_ms']['p95']} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the chat endpoints")
+    parser.add_argument("--url", default=None, help="app base URL (default: the spawned app)")
+    parser.add_argument("--mode", choices=sorted(SENDERS), default="chat")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--customers", type=int, default=100, help="distinct simulated customers")
+    parser.add_argument("--batch-size", type=int, default=20, help="items per /ai/chat/batch request")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--label", default=None, help="results are compared with earlier runs of the same label")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95/rps change before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a regression is flagged")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to the history")
+    parser.add_argument("--spawn", action="store_true", help="start benchmarks.fake_groq and the app locally")
+    parser.add_argument("--fake-args", default="--latency lognormal:0.4:0.4", help="options for benchmarks.fake_groq")
+    parser.add_argument("--fake-port", type=int, default=9200)
+    parser.add_argument("--app-port", type=int, default=8900)
+    args = parser.parse_args()
+
+    url = args.url or f"http://127.0.0.1:{args.app_port}"
+    label = args.label or (f"spawn {args.fake_args}" if args.spawn else url)
+    processes = spawn_stack(args) if args.spawn else []
+    try:
+        results = [
+            asyncio.run(run_level(url, args.mode, int(level), args.requests, args))
+            for level in args.concurrency.split(",")
+        ]
+    finally:
+        stop_stack(processes)
+
+    previous = load_previous(label)
+    regressions = {
+        index: found for index, result in enumerate(results)
+        if (found := find_regressions(result, previous.get((result["mode"], result["concurrency"])), args.tolerance))
+    }
+    print_results(results, regressions)
+    if not args.no_save:
+        save_run(label, args, results)
+        print(f"Saved to {os.path.relpath(RESULTS_FILE, PROJECT_ROOT)} (label: {label})")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
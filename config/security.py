@@ -1,5 +1,9 @@
 from cryptography.fernet import Fernet
 import base64
+import hashlib
+import hmac
+import re
+from typing import Optional
 from config.settings import settings
 
 class DataEncryptor:
@@ -13,6 +17,10 @@ class DataEncryptor:
             self.fernet = Fernet(self.key.encode())
         except Exception as e:
             raise ValueError(f"Invalid encryption key: {e}. Please generate a new key using fix_keys.py")
+        
+        # Separate key for blind indexes so index values reveal nothing about the Fernet key
+        blind_key = settings.BLIND_INDEX_KEY or hmac.new(self.key.encode(), b"blind-index", hashlib.sha256).hexdigest()
+        self.blind_index_key = blind_key.encode()
     
     def encrypt(self, data: str) -> str:
         """Encrypt sensitive data like emails and phone numbers"""
@@ -25,6 +33,23 @@ class DataEncryptor:
         if not encrypted_data:
             return ""
         return self.fernet.decrypt(encrypted_data.encode()).decode()
+    
+    def blind_index(self, value: str, kind: str) -> Optional[str]:
+        """Deterministic keyed HMAC of a normalized email/phone, for equality lookups"""
+        normalized = normalize_email(value) if kind == "email" else normalize_phone(value)
+        if not normalized:
+            return None
+        message = f"{kind}:{normalized}".encode()
+        return hmac.new(self.blind_index_key, message, hashlib.sha256).hexdigest()
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+def normalize_phone(phone: str) -> str:
+    """Digits only (keeps a leading +) so formatting differences still match"""
+    phone = (phone or "").strip()
+    digits = re.sub(r"\D", "", phone)
+    return f"+{digits}" if phone.startswith("+") and digits else digits
 
 # Create global encryptor instance
-encryptor = DataEncryptor()
\ No newline at end of file
+encryptor = DataEncryptor()
@@ -1,6 +1,12 @@
 import os
 from pydantic_settings import BaseSettings
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def project_path(path: str) -> str:
+    """Resolve a configured path relative to the project root"""
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
 class Settings(BaseSettings):
     # Application
     APP_NAME: str = "MissTera AI Agent"
@@ -10,12 +16,147 @@ class Settings(BaseSettings):
     # Security - With defaults for development
     ENCRYPTION_KEY: str = "dev-key-not-for-production-12345"
     JWT_SECRET_KEY: str = "dev-jwt-secret-not-for-production-12345"
+    # HMAC key for email/phone blind indexes; derived from ENCRYPTION_KEY when empty.
+    # Changing it requires re-running backfill_blind_indexes.py
+    BLIND_INDEX_KEY: str = ""
     
     # AI API - Optional for development
     GROQ_API_KEY: str = "not-set"
+    GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
+    
+    # AI HTTP client - shared pooled connections to the Groq API
+    GROQ_HTTP2: bool = True
+    GROQ_MAX_CONNECTIONS: int = 200
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    GROQ_KEEPALIVE_EXPIRY: float = 30.0
+    GROQ_CONNECT_TIMEOUT: float = 5.0
+    GROQ_TIMEOUT: float = 30.0
+    
+    # Model routing - circuit breaker and latency-aware fallback chain
+    GROQ_MODELS: list = ["llama-3.1-8b-instant", "llama3-8b-8192", "mixtral-8x7b-32768"]
+    GROQ_GENERATION_DEADLINE: float = 20.0  # total budget across all models
+    MODEL_HEALTH_WINDOW: int = 50
+    MODEL_MIN_SAMPLES: int = 5
+    MODEL_ERROR_THRESHOLD: float = 0.5
+    MODEL_MAX_P95_SECONDS: float = 0.0  # 0 disables latency-based circuit opening
+    MODEL_COOLDOWN_SECONDS: float = 30.0
+    MODEL_DECOMMISSION_COOLDOWN_SECONDS: float = 3600.0
+    MODEL_HEDGE_AFTER_MS: int = 0  # 0 disables hedging a second model
+    
+    # LLM scheduler - admission control in front of every generation attempt
+    LLM_MAX_CONCURRENCY: int = 64
+    LLM_LOW_PRIORITY_SHARE: float = 0.25  # share of slots batch/demo traffic may use
+    LLM_RATE_LIMIT_RETRIES: int = 2  # retries of a 429'd model once its quota recovers
+    LLM_DEFAULT_RETRY_AFTER: float = 1.0  # seconds, when a 429 carries no reset hint
+    
+    # Intent / escalation keyword tables
+    KEYWORDS_FILE: str = "config/keywords.json"
+    
+    # Fast path - answer templated FAQ intents without calling the LLM
+    FAST_PATH_ENABLED: bool = True
+    FAST_PATH_ANSWERS_FILE: str = "config/faq_answers.json"
+    FAST_PATH_THRESHOLDS: dict = {"shipping": 0.8, "returns": 0.8, "product_info": 0.8}  # intent -> min confidence
+    
+    # Response cache - exact and near-duplicate reuse of AI answers
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+    RESPONSE_CACHE_DEFAULT_TTL: int = 900  # seconds
+    RESPONSE_CACHE_TTLS: dict = {"shipping": 3600, "returns": 3600, "general_help": 3600, "product_info": 600, "order_status": 0}  # 0 disables caching
+    RESPONSE_CACHE_MIN_SIMILARITY: float = 0.8
+    
+    # Conversation history - in-memory window of recent turns per customer
+    HISTORY_WINDOW: int = 10  # turns kept per customer
+    HISTORY_CACHE_ENABLED: bool = True
+    HISTORY_CACHE_MAX_CUSTOMERS: int = 10000
+    HISTORY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    
+    # Burst coalescing - merge a customer's back-to-back messages into one generation
+    COALESCE_ENABLED: bool = False
+    COALESCE_WINDOW_MS: int = 1500  # debounce: wait this long after the latest message
+    COALESCE_MAX_WAIT_MS: int = 5000  # never hold the first message longer than this
+    COALESCE_MAX_MESSAGES: int = 10
+    
+    # Batch chat endpoint
+    CHAT_BATCH_MAX_ITEMS: int = 500
+    CHAT_BATCH_CONCURRENCY: int = 16  # LLM calls in flight per batch
+    
+    # Prompt assembly - history is filled newest-first up to the input token budget
+    PROMPT_TOKEN_BUDGET: int = 1500  # estimated input tokens per request
+    SUMMARY_MAX_NOTES: int = 20  # recent customer messages kept in the rolling summary
+    SUMMARY_NOTE_CHARS: int = 120
+    
+    # Customer identity cache - (platform, social_media_id) -> customer
+    CUSTOMER_CACHE_TTL: float = 300.0
+    CUSTOMER_CACHE_MAX_ENTRIES: int = 50000
+    
+    # Decrypted PII cache - keeps repeat reads from re-running Fernet verify + decrypt
+    PII_CACHE_ENABLED: bool = True
+    PII_CACHE_MAX_ENTRIES: int = 1000
+    PII_CACHE_TTL: float = 60.0
+    
+    # Metrics - Prometheus /metrics is always on; Server-Timing exposes stage timings to clients
+    SERVER_TIMING_ENABLED: bool = False
+    
+    # Profiling - off means the middleware isn't installed at all. Requests carrying
+    # PROFILER_ADMIN_TOKEN (X-Profile header or ?profile=) are profiled; PROFILE_SAMPLE_RATE
+    # additionally profiles that fraction of all requests. Folded stacks go to a ring in PROFILE_DIR
+    PROFILING_ENABLED: bool = False
+    PROFILER_ADMIN_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_DIR: str = "profiles"
+    PROFILE_MAX_FILES: int = 50
+    
+    # Write-behind persistence - batch conversation writes off the request path
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_MAX_QUEUE: int = 10000
+    WRITE_BEHIND_BATCH_SIZE: int = 200
+    WRITE_BEHIND_FLUSH_MS: int = 50
+    WRITE_BEHIND_DRAIN_TIMEOUT: float = 30.0
+    
+    # Order lookup - order IDs in messages are resolved read-through via the order_cache table.
+    # ORDER_SOURCE_FILE is a JSON/CSV stand-in for the order system (empty = cache only)
+    ORDER_LOOKUP_ENABLED: bool = True
+    ORDER_ID_PATTERN: str = r"\bORD[-\s]?\d{4,12}\b"
+    ORDER_SOURCE_FILE: str = ""
+    ORDER_CACHE_TTL: float = 300.0  # seconds before a cached order is refreshed from the source
+    ORDER_CONTEXT_MAX: int = 3  # orders summarized in the prompt
+    ORDER_DIRECT_ANSWERS: bool = True  # answer status questions without the LLM when all orders are found
+    # A direct answer needs an explicit status/tracking cue and none of the wording that asks for a change
+    ORDER_STATUS_CUE_PATTERN: str = (r"\b(where('s| is)|status|track(ing|ed)?|shipped|eta|update on|"
+                                     r"when (will|does|is|should)|on (its|the) way)\b")
+    ORDER_NON_STATUS_PATTERN: str = (r"\b(cancel\w*|chang\w*|modif\w*|edit|address|return\w*|refund\w*|"
+                                     r"exchang\w*|damaged|broken|wrong|missing|never (arrived|came)|not received|late)\b")
+    ORDER_SYNC_BATCH_SIZE: int = 500
+    
+    # Demo / simulator - /demo routes and the synthetic users behind simulate_traffic.py.
+    # Off by default so production doesn't expose them; demos and load tests set DEMO_ENABLED=true
+    DEMO_ENABLED: bool = False
+    SIMULATOR_USERS: int = 1000
+    SIMULATOR_MAX_CONVERSATIONS: int = 1000  # users whose history is kept (least recently active dropped)
+    SIMULATOR_HISTORY_PER_USER: int = 50  # messages kept per user
+    
+    # Bulk customer import
+    IMPORT_CHUNK_SIZE: int = 2000
+    IMPORT_WORKERS: int = 0  # encryption processes; 0 = one per CPU
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./social_ai_agent.db")
+    STORAGE_PROFILE: str = "tuned"  # "tuned" applies the settings below, "default" keeps driver defaults
+    
+    # SQLite (tuned profile)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_BUDGET_KB: int = 64 * 1024  # page cache for the whole pool, split across its connections
+    
+    # Connection pool (tuned profile)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # seconds
     
     # CORS
     CORS_ORIGINS: list = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -14,6 +14,7 @@ def generate_proper_keys():
     print("=" * 60)
     print(f"ENCRYPTION_KEY={proper_key}")
     print(f"JWT_SECRET_KEY={jwt_secret}")
+    print(f"BLIND_INDEX_KEY={secrets.token_urlsafe(32)}")
     print("=" * 60)
     print("\n⚠️  COPY THESE EXACTLY - don't modify them!")
     print("⚠️  Replace the existing keys in your .env file")
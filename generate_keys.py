@@ -10,6 +10,7 @@ def generate_security_keys():
     print("=" * 50)
     print(f"ENCRYPTION_KEY={encryption_key}")
     print(f"JWT_SECRET_KEY={jwt_secret}")
+    print(f"BLIND_INDEX_KEY={secrets.token_urlsafe(32)}")
     print("=" * 50)
 
 if __name__ == "__main__":
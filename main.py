@@ -1,26 +1,61 @@
 import os
-from app.services.conversation_manager import get_conversation_manager
-from fastapi import FastAPI, Depends, HTTPException, status
+import json
+import tempfile
+from app.services.conversation_manager import get_conversation_manager, acoalesce_message
+from fastapi import FastAPI, Depends, HTTPException, status, Body, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import logging
+from typing import List, Optional
+from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
 
-from config.settings import settings
-from app.models.database import secure_session, Customer, Conversation
+from config.settings import settings, project_path
+from app.models.database import secure_session, Customer, Conversation, get_db
 from app.utils.security_utils import mask_sensitive_data
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.instrumentation import RequestCounterMiddleware, endpoint_counters
+from app.utils.metrics import metrics
+from app.utils.profiler import ProfilerMiddleware, ProfileRing, is_admin
+from app.utils.pii_cache import pii_cache
+from app.services.ai_service import ai_service
+from app.services.model_router import model_router
+from app.services.llm_scheduler import llm_scheduler
+from app.services.fast_path import fast_path_router
+from app.services.response_cache import response_cache
+from app.services.keyword_matcher import keyword_matcher
+from app.services.history_cache import history_cache
+from app.services.customer_cache import customer_cache
+from app.services.prompt_builder import prompt_builder
+from app.services.conversation_writer import conversation_writer
+from app.services.message_coalescer import message_coalescer
+from app.services.customer_import import import_customers, validate_rows
+from app.services.customer_lookup import find_customers
+from app.services.order_lookup import order_service
+from app.api import demo
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # per-request LLM call logs are too noisy
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"Starting {settings.APP_NAME} in {settings.ENVIRONMENT} mode")
+    logger.info(f"Storage profile: {secure_session.storage_report()}")
+    if settings.WRITE_BEHIND_ENABLED:
+        conversation_writer.start()
     yield
     # Shutdown
     logger.info("Shutting down application")
+    # Durable drain: flush every queued conversation before the process exits
+    conversation_writer.drain(settings.WRITE_BEHIND_DRAIN_TIMEOUT)
+    await ai_service.aclose()
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -38,12 +73,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
-    db = secure_session.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Per-request counters (PII decrypts, ...) aggregated per endpoint
+app.add_middleware(RequestCounterMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
+def collect_component_metrics():
+    """Cache hit rates and scheduler load, read from the components at scrape time"""
+    caches = {
+        "customer": customer_cache.stats(),
+        "history": history_cache.stats(),
+        "pii": pii_cache.stats(),
+        "response": response_cache.stats()
+    }
+    caches["response"]["hits"] = caches["response"]["exact_hits"] + caches["response"]["near_hits"]
+    scheduler = llm_scheduler.stats()
+    return [
+        ("cache_hits_total", "counter", "Cache hits", [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("cache_misses_total", "counter", "Cache misses", [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("cache_hit_ratio", "gauge", "Cache hit ratio since start", [({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()]),
+        ("llm_scheduler_in_flight", "gauge", "LLM calls holding a scheduler slot", [({}, scheduler["in_flight"])]),
+        ("llm_scheduler_queued", "gauge", "LLM calls waiting for a scheduler slot", [({}, scheduler["queued"])])
+    ]
+
+metrics.collector(collect_component_metrics)
+
+profile_ring = ProfileRing(project_path(settings.PROFILE_DIR), settings.PROFILE_MAX_FILES)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilerMiddleware,
+        ring=profile_ring,
+        admin_token=settings.PROFILER_ADMIN_TOKEN,
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        interval=settings.PROFILE_INTERVAL_MS / 1000
+    )
+
+if settings.DEMO_ENABLED:
+    app.include_router(demo.router)
+
+def require_profiler_admin(request: Request):
+    """Profiles expose code paths and timings - admin token only, and 404 while profiling is off"""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not is_admin(settings.PROFILER_ADMIN_TOKEN, request.headers.get("x-profile")):
+        raise HTTPException(status_code=403, detail="Admin token required")
 
 @app.get("/")
 async def root():
@@ -71,18 +142,28 @@ async def create_customer(
     platform: str = "instagram",
     first_name: str = "",
     last_name: str = "",
+    phone: str = "",
     db: Session = Depends(get_db)
 ):
     """Create a new customer record"""
     customer = Customer()
     customer.set_email(email)
+    if phone:
+        customer.set_phone(phone)
     customer.social_media_id = social_media_id
     customer.platform = platform
     customer.first_name = first_name
     customer.last_name = last_name
     
     db.add(customer)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Customer {social_media_id} already exists on {platform}"
+        )
     db.refresh(customer)
     
     return {
@@ -92,22 +173,114 @@ async def create_customer(
         "message": "Customer created successfully"
     }
 
+def _customer_row(row) -> dict:
+    return {
+        "id": row.id,
+        "social_media_id": row.social_media_id,
+        "platform": row.platform,
+        "first_name": row.first_name,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    }
+
+def _conversation_row(row) -> dict:
+    return {
+        "id": row.id,
+        "user_message": row.message_text,
+        "ai_response": row.ai_response,
+        "intent": row.intent,
+        "requires_human": row.requires_human,
+        "timestamp": row.created_at.isoformat() if row.created_at else None
+    }
+
+def _ndjson_response(statement, serialize) -> StreamingResponse:
+    """Stream rows as NDJSON from a server-side cursor, one batch in memory at a time"""
+    def rows():
+        # The session must outlive the handler, so the stream owns it
+        db = secure_session.SessionLocal()
+        try:
+            result = db.execute(statement.execution_options(yield_per=500))
+            for row in result:
+                yield json.dumps(serialize(row)) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+def _decode_cursor_or_400(cursor: str, size: int) -> list:
+    try:
+        return decode_cursor(cursor, size)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @app.get("/customers/")
-async def get_customers(db: Session = Depends(get_db)):
-    """Get all customers"""
-    customers = db.query(Customer).all()
+async def get_customers(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    """List customers, keyset-paginated by id (or streamed as NDJSON with stream=true)"""
+    statement = select(
+        Customer.id, Customer.social_media_id, Customer.platform, Customer.first_name, Customer.created_at
+    ).order_by(Customer.id)
+    if cursor:
+        (after_id,) = _decode_cursor_or_400(cursor, 1)
+        statement = statement.where(Customer.id > after_id)
+    
+    if stream:
+        return _ndjson_response(statement, _customer_row)
+    
+    rows = db.execute(statement.limit(limit + 1)).all()
+    page = rows[:limit]
     return {
-        "customers": [
-            {
-                "id": customer.id,
-                "social_media_id": customer.social_media_id,
-                "platform": customer.platform,
-                "first_name": customer.first_name,
-                "created_at": customer.created_at.isoformat()
-            } for customer in customers
-        ]
+        "customers": [_customer_row(row) for row in page],
+        "next_cursor": encode_cursor(page[-1].id) if len(rows) > limit else None
     }
 
+@app.post("/customers/lookup")
+async def lookup_customers(
+    email: Optional[str] = Body(None),
+    phone: Optional[str] = Body(None),
+    platform: Optional[str] = Body(None),
+    db: Session = Depends(get_db)
+):
+    """Find customers by email and/or phone (in the body, so PII stays out of URLs and logs)"""
+    if not email and not phone:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide an email or phone")
+    customers = find_customers(db, email=email or None, phone=phone or None, platform=platform)
+    return {"customers": [_customer_row(customer) for customer in customers]}
+
+@app.post("/customers/import")
+async def import_customers_endpoint(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db)
+):
+    """Bulk upsert customers from a raw NDJSON or CSV request body"""
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    
+    # Spool the body to disk as it arrives so large uploads never sit in memory
+    with tempfile.TemporaryFile(mode="w+b") as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        
+        def read_lines():
+            spool.seek(0)
+            return open(spool.fileno(), encoding="utf-8", newline="", closefd=False)
+        
+        def run():
+            # The import commits chunk by chunk, so reject bad input before the first write
+            with read_lines() as lines:
+                validate_rows(lines, fmt)
+            with read_lines() as lines:
+                return import_customers(db, lines, fmt=fmt)
+        
+        try:
+            return await run_in_threadpool(run)
+        except (ValueError, KeyError, UnicodeDecodeError) as e:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {fmt} input: {e}")
+
 @app.post("/ai/chat")
 async def ai_chat_endpoint(
     message: str,
@@ -116,13 +289,16 @@ async def ai_chat_endpoint(
     db: Session = Depends(get_db)
 ):
     """Main endpoint for AI chat conversations"""
-    conversation_manager = get_conversation_manager(db)
-    
-    result = conversation_manager.process_message(
-        user_message=message,
-        social_media_id=social_media_id,
-        platform=platform
-    )
+    if settings.COALESCE_ENABLED:
+        # Back-to-back messages from this customer share one generation and one reply
+        result = await acoalesce_message(message, social_media_id, platform)
+    else:
+        conversation_manager = get_conversation_manager(db)
+        result = await conversation_manager.aprocess_message(
+            user_message=message,
+            social_media_id=social_media_id,
+            platform=platform
+        )
     
     return {
         "success": True,
@@ -130,32 +306,180 @@ async def ai_chat_endpoint(
         "intent": result["intent"],
         "requires_human": result["requires_human"],
         "customer_id": result["customer_id"],
-        "suggested_actions": result["suggested_actions"]
+        "suggested_actions": result["suggested_actions"],
+        "coalesced_messages": result.get("coalesced_messages", 1)
+    }
+
+class ChatBatchItem(BaseModel):
+    social_media_id: str
+    platform: str = "instagram"
+    message: str = Field(..., min_length=1)
+
+@app.post("/ai/chat/batch")
+async def ai_chat_batch_endpoint(
+    items: List[ChatBatchItem] = Body(..., embed=True, min_length=1, max_length=settings.CHAT_BATCH_MAX_ITEMS),
+    db: Session = Depends(get_db)
+):
+    """Answer a batch of messages (e.g. an inbox sync); results are per item, in request order"""
+    conversation_manager = get_conversation_manager(db)
+    results = await conversation_manager.aprocess_batch([item.model_dump() for item in items])
+    return {
+        "success": all(result["success"] for result in results),
+        "results": results
+    }
+
+@app.api_route("/ai/chat/stream", methods=["GET", "POST"])
+async def ai_chat_stream_endpoint(
+    message: str,
+    social_media_id: str,
+    platform: str = "instagram"
+):
+    """Streaming AI chat - relays tokens as server-sent events (EventSource friendly)"""
+    async def event_stream():
+        # The session must outlive the handler, so the stream owns it
+        db = secure_session.SessionLocal()
+        try:
+            conversation_manager = get_conversation_manager(db)
+            async for event in conversation_manager.astream_message(
+                user_message=message,
+                social_media_id=social_media_id,
+                platform=platform
+            ):
+                if "delta" in event:
+                    yield f"data: {json.dumps({'delta': event['delta']})}\n\n"
+                else:
+                    yield f"event: done\ndata: {json.dumps({'success': True, **event['done']})}\n\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/ai/intents/batch")
+async def ai_intents_batch(messages: List[str] = Body(..., embed=True)):
+    """Classify many messages at once (intent scores and escalation, no LLM)"""
+    return {
+        "results": [match.to_dict() for match in keyword_matcher.analyze_batch(messages)]
+    }
+
+@app.get("/ai/models/health")
+async def ai_models_health():
+    """Circuit state, error rate and p95 latency for each configured model"""
+    return {
+        "routing_order": model_router.candidates(),
+        "models": model_router.snapshot()
+    }
+
+@app.get("/ai/scheduler/stats")
+async def ai_scheduler_stats():
+    """LLM admission queue: depth and wait times per priority lane, learned quotas per model"""
+    return llm_scheduler.stats()
+
+@app.get("/ai/fast-path/stats")
+async def ai_fast_path_stats():
+    """Hit rate and estimated latency saved by the LLM-free FAQ fast path"""
+    return fast_path_router.stats(llm_latency=model_router.mean_latency())
+
+@app.get("/ai/cache/stats")
+async def ai_cache_stats():
+    """Response cache size and hit rates"""
+    return response_cache.stats()
+
+@app.delete("/ai/cache")
+async def ai_cache_invalidate(intent: str = None):
+    """Invalidate cached AI answers (all, or only one intent)"""
+    return {"invalidated": response_cache.invalidate(intent)}
+
+@app.get("/ai/history-cache/stats")
+async def ai_history_cache_stats():
+    """Per-customer conversation window cache occupancy and hit rate"""
+    return history_cache.stats()
+
+@app.get("/ai/prompt/stats")
+async def ai_prompt_stats():
+    """Prompt size against the token budget, and how much history was kept or summarized"""
+    return prompt_builder.stats()
+
+@app.get("/ai/coalescing/stats")
+async def ai_coalescing_stats():
+    """Burst coalescing: messages received versus generations run"""
+    return message_coalescer.stats()
+
+@app.get("/ai/orders/stats")
+async def ai_orders_stats():
+    """Order lookup: cache hit rate, source fetches, direct answers"""
+    return order_service.stats()
+
+@app.get("/ai/write-behind/stats")
+async def ai_write_behind_stats():
+    """Write-behind queue depth and batch statistics"""
+    return conversation_writer.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition: request/stage/LLM histograms, token usage, cache hit rates"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiles", dependencies=[Depends(require_profiler_admin)])
+async def list_profiles():
+    """Stored profiles, newest first"""
+    return {"profiles": profile_ring.list()}
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_profiler_admin)],
+         response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """Folded stacks for flamegraph.pl / speedscope"""
+    folded = profile_ring.read(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded)
+
+@app.get("/instrumentation/endpoints")
+async def instrumentation_endpoints():
+    """Per-endpoint request counters: db_queries, db_ms, llm_ms, llm_queue_ms, pii_decrypts"""
+    return endpoint_counters.snapshot()
+
+@app.get("/ai/pii/stats")
+async def ai_pii_stats():
+    """Plaintext PII cache statistics and decrypts performed per endpoint"""
+    return {
+        "cache": pii_cache.stats(),
+        "decrypts": endpoint_counters.snapshot()
     }
 
 @app.get("/conversations/{customer_id}")
 async def get_conversation_history(
     customer_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get conversation history for a customer"""
-    conversations = db.query(Conversation).filter(
+    """Get conversation history for a customer, keyset-paginated by id (ids increase with insert time)"""
+    statement = select(
+        Conversation.id, Conversation.message_text, Conversation.ai_response,
+        Conversation.intent, Conversation.requires_human, Conversation.created_at
+    ).where(
         Conversation.customer_id == customer_id
-    ).order_by(Conversation.created_at.asc()).all()
+    ).order_by(Conversation.id.asc())
+    if cursor:
+        (after_id,) = _decode_cursor_or_400(cursor, 1)
+        statement = statement.where(Conversation.id > after_id)
     
+    if stream:
+        return _ndjson_response(statement, _conversation_row)
+    
+    rows = db.execute(statement.limit(limit + 1)).all()
+    page = rows[:limit]
     return {
         "customer_id": customer_id,
-        "conversations": [
-            {
-                "id": conv.id,
-                "user_message": conv.message_text,
-                "ai_response": conv.ai_response,
-                "intent": conv.intent,
-                "requires_human": conv.requires_human,
-                "timestamp": conv.created_at.isoformat()
-            } for conv in conversations
-        ]
+        "conversations": [_conversation_row(row) for row in page],
+        "next_cursor": encode_cursor(page[-1].id) if len(rows) > limit else None
     }
+
 @app.get("/ai/chat-test")
 async def ai_chat_test_endpoint(
     message: str,
@@ -166,7 +490,7 @@ async def ai_chat_test_endpoint(
     """TEST endpoint for AI chat (GET method for browser testing)"""
     conversation_manager = get_conversation_manager(db)
     
-    result = conversation_manager.process_message(
+    result = await conversation_manager.aprocess_message(
         user_message=message,
         social_media_id=social_media_id,
         platform=platform
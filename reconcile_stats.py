@@ -0,0 +1,24 @@
+import argparse
+import logging
+
+from app.models.database import secure_session
+from app.services.customer_stats import reconcile_customer_stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill / reconcile per-customer conversation counters")
+    parser.add_argument("--batch-size", type=int, default=1000, help="customers per committed batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = secure_session.SessionLocal()
+    try:
+        result = reconcile_customer_stats(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print("=" * 50)
+    print(f"Reconciled {result['customers']} customers in {result['seconds']}s")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ pip install uvicorn[standard]==0.24.0
 pip install sqlalchemy==2.0.23
 pip install python-dotenv==1.0.0
 pip install requests==2.31.0
+pip install "httpx[http2]==0.25.2"
 pip install pydantic==2.5.0
 
 # Install cryptography with pre-compiled wheels (no Rust)
@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import json
+import logging
+
+from app.services.llm_scheduler import PRIORITY_LOW, PRIORITY_NORMAL
+from app.services.load_driver import LoadDriver, InProcessTarget, HttpTarget, ARRIVALS
+from app.services.social_simulator import SocialSimulator
+
+async def run(args) -> dict:
+    simulator = SocialSimulator(synthetic_users=args.users, seed=args.seed)
+    if args.url:
+        target = HttpTarget(args.url, max_connections=args.max_in_flight)
+    else:
+        target = InProcessTarget(priority=PRIORITY_LOW if args.priority == "low" else PRIORITY_NORMAL)
+    driver = LoadDriver(simulator, target, rate=args.rate, arrival=args.arrival,
+                        max_in_flight=args.max_in_flight, seed=args.seed)
+    try:
+        return await driver.run(args.duration)
+    finally:
+        await target.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the conversation path with simulated social media traffic")
+    parser.add_argument("--url", help="base URL of a running app (default: drive the pipeline in-process)")
+    parser.add_argument("--rate", type=float, default=20.0, help="target messages per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of arrivals")
+    parser.add_argument("--arrival", choices=sorted(ARRIVALS), default="poisson")
+    parser.add_argument("--users", type=int, default=5000, help="synthetic users")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="arrivals beyond this are dropped")
+    parser.add_argument("--priority", choices=["low", "normal"], default="low", help="LLM lane for in-process traffic")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    latency = result["latency_ms"]
+    print("=" * 60)
+    print(f"{result['arrival']} arrivals, {result['target']}: target {result['target_rate']}/s, "
+          f"offered {result['offered_rate']}/s, achieved {result['achieved_rps']}/s")
+    print(f"Sent {result['sent']}, completed {result['completed']}, errors {result['errors']}, "
+          f"dropped {result['dropped']} in {result['seconds']}s")
+    print(f"Latency ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
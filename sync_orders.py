@@ -0,0 +1,27 @@
+import argparse
+import logging
+
+from app.models.database import secure_session
+from app.services.order_lookup import order_service, FileOrderSource
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load orders from the order source into the order cache")
+    parser.add_argument("--source", help="JSON/CSV order file (default: ORDER_SOURCE_FILE)")
+    parser.add_argument("--batch-size", type=int, default=None, help="orders per committed batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.source:
+        order_service.source = FileOrderSource(args.source)
+    db = secure_session.SessionLocal()
+    try:
+        result = order_service.sync(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print("=" * 50)
+    print(f"Synced {result['orders']} orders in {result['batches']} batches ({result['seconds']}s)")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
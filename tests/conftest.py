@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database and a valid key before anything imports settings
+_DB_DIR = tempfile.mkdtemp(prefix="social-ai-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("ENCRYPTION_KEY", "hJwVRBj1E0my-7FpzRhPhRhbzc4inIEoBtYaYZdwImg=")
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.models.database import Base, secure_session  # noqa: E402
+
+@pytest.fixture
+def db():
+    """A session on an empty database; every table is cleared afterwards"""
+    session = secure_session.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.services import conversation_manager as conversation_module
+from app.services.ai_service import ai_service
+from app.services.conversation_manager import ConversationManager
+from app.services.keyword_matcher import keyword_matcher
+
+@pytest.fixture
+def analyze_calls(monkeypatch):
+    """Counts keyword passes; the model call is replaced by a canned answer"""
+    calls = []
+    analyze = keyword_matcher.analyze
+
+    def counting_analyze(message):
+        calls.append(message)
+        return analyze(message)
+
+    async def answer(user_message, match, *args, **kwargs):
+        return ai_service._build_result(match, "Happy to help!")
+
+    monkeypatch.setattr(keyword_matcher, "analyze", counting_analyze)
+    monkeypatch.setattr(ai_service, "_agenerate_uncached", answer)
+    return calls
+
+@pytest.mark.parametrize("message", [
+    "I'm furious, let me talk to a manager about my jacket",
+    "Can you recommend a gift for my dad?",
+])
+def test_message_is_analyzed_once(db, analyze_calls, message):
+    result = asyncio.run(ConversationManager(db).aprocess_message(message, "ig_once", "instagram"))
+
+    assert analyze_calls == [message]
+    assert result["requires_human"] == keyword_matcher.analyze(message).requires_human
+
+def test_escalation_jumps_the_queue(db, analyze_calls):
+    manager = ConversationManager(db)
+
+    assert manager._priority(keyword_matcher.analyze("I want a supervisor"), {}) == conversation_module.PRIORITY_HIGH
+    assert manager._priority(keyword_matcher.analyze("hello"), {"conversation_count": 0}) == conversation_module.PRIORITY_NORMAL
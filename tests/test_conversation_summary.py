@@ -0,0 +1,34 @@
+from app.models.database import ConversationSummary, secure_session
+from app.services.conversation_summary import get_summary, update_summaries
+
+def record(customer_id, message, intent="order_status"):
+    return {"customer_id": customer_id, "user_message": message, "intent": intent}
+
+def test_first_save_creates_and_later_saves_fold_in(db):
+    update_summaries(db, [record(1, "where is my order"), record(1, "thanks", "general_help")])
+    db.commit()
+    update_summaries(db, [record(1, "and the other one?")])
+    db.commit()
+
+    summary = get_summary(db, 1)
+    assert summary["turns"] == 3
+    assert summary["intent_counts"] == {"order_status": 2, "general_help": 1}
+    assert summary["notes"][-1] == "and the other one?"
+
+def test_concurrent_first_saves_do_not_conflict_or_lose_updates(db):
+    # This session read "no summary yet" (as prompt building does) before another writer created it
+    assert get_summary(db, 1) is None
+    other = secure_session.SessionLocal()
+    try:
+        update_summaries(other, [record(1, "from the other worker", "shipping")])
+        other.commit()
+    finally:
+        other.close()
+
+    update_summaries(db, [record(1, "from this worker")])
+    db.commit()
+
+    summary = get_summary(db, 1)
+    assert summary["turns"] == 2
+    assert summary["intent_counts"] == {"shipping": 1, "order_status": 1}
+    assert db.query(ConversationSummary).count() == 1
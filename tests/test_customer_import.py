@@ -0,0 +1,41 @@
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.database import Customer
+from app.services.customer_import import validate_rows
+from config.settings import settings
+from main import app
+
+def ndjson(count):
+    return "".join(json.dumps({"social_media_id": f"ig_{n}", "email": f"c{n}@example.com"}) + "\n" for n in range(count))
+
+def test_validate_counts_rows():
+    assert validate_rows(io.StringIO(ndjson(3) + "\n"), "ndjson") == 3
+    assert validate_rows(io.StringIO("social_media_id,email\nig_1,a@example.com\n"), "csv") == 1
+
+@pytest.mark.parametrize("body, line", [
+    (ndjson(4) + "{not json\n" + ndjson(1), 5),
+    (ndjson(2) + "[1, 2]\n", 3),
+])
+def test_validate_names_the_bad_line(body, line):
+    with pytest.raises(ValueError, match=f"^line {line}:"):
+        validate_rows(io.StringIO(body), "ndjson")
+
+def test_bad_line_late_in_the_upload_imports_nothing(db, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "IMPORT_WORKERS", 1)
+    client = TestClient(app)
+
+    response = client.post("/customers/import", content=ndjson(6) + "{broken\n")
+
+    assert response.status_code == 400
+    assert "line 7" in response.json()["detail"]
+    assert db.query(Customer).count() == 0
+
+    response = client.post("/customers/import", content=ndjson(6))
+    assert response.status_code == 200
+    assert response.json()["rows"] == 6
+    assert db.query(Customer).count() == 6
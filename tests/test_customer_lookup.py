@@ -0,0 +1,39 @@
+from app.models.database import Customer
+from app.services.customer_lookup import find_customers
+
+def add_customer(db, social_media_id, email=None, phone=None, platform="instagram"):
+    customer = Customer(social_media_id=social_media_id, platform=platform)
+    if email is not None:
+        customer.set_email(email)
+    if phone is not None:
+        customer.set_phone(phone)
+    db.add(customer)
+    db.commit()
+    return customer
+
+def test_matches_normalized_email_and_phone(db):
+    sarah = add_customer(db, "ig_1", email="Sarah@Example.com", phone="+1 (555) 010-2000")
+    add_customer(db, "ig_2", email="mike@example.com")
+
+    assert [c.id for c in find_customers(db, email="  sarah@example.COM ")] == [sarah.id]
+    assert [c.id for c in find_customers(db, phone="+1 555 010 2000")] == [sarah.id]
+
+def test_both_given_must_both_match(db):
+    add_customer(db, "ig_1", email="sarah@example.com", phone="5550102000")
+
+    assert find_customers(db, email="sarah@example.com", phone="5559999999") == []
+
+def test_platform_filter(db):
+    add_customer(db, "ig_1", email="sam@example.com", platform="instagram")
+    whatsapp = add_customer(db, "wa_1", email="sam@example.com", platform="whatsapp")
+
+    assert [c.id for c in find_customers(db, email="sam@example.com", platform="whatsapp")] == [whatsapp.id]
+
+def test_value_that_normalizes_to_nothing_matches_no_one(db):
+    # Customers with no email/phone stored have NULL blind indexes
+    add_customer(db, "ig_1")
+    add_customer(db, "ig_2", email="sarah@example.com")
+
+    assert find_customers(db, phone="n/a") == []
+    assert find_customers(db, email="   ") == []
+    assert find_customers(db, email="sarah@example.com", phone="n/a") == []
@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.utils.instrumentation import _request_counters, instrument_engine
+
+@pytest.fixture
+def counters():
+    counters = {}
+    token = _request_counters.set(counters)
+    yield counters
+    _request_counters.reset(token)
+
+def test_failed_statements_do_not_skew_later_timings(counters):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("SELECT 2"))
+
+        assert not connection.info.get("query_started")
+
+    assert counters["db_queries"] == 2
+    assert 0 <= counters["db_ms"] < 1000
@@ -0,0 +1,43 @@
+import pytest
+
+from app.services.keyword_matcher import KeywordMatcher
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher(
+        intents={
+            "order_status": ["order", "order status", "where is my order", "tracking"],
+            "returns": ["return", "refund", "return policy"],
+            "shipping": ["ship", "shipping"],
+            "general_help": ["help"],
+        },
+        escalation_keywords=["manager", "cancel my account"],
+        escalation_intents=["returns"],
+    )
+
+def test_finds_overlapping_and_prefix_phrases(matcher):
+    assert matcher.find("Where is my ORDER status?") == ["order", "order status", "where is my order"]
+    assert matcher.find("shipping") == ["ship", "shipping"]
+
+def test_multi_word_phrases_outweigh_single_words(matcher):
+    match = matcher.analyze("where is my order? also about a refund")
+
+    assert match.intent == "order_status"
+    assert match.scores["order_status"] > match.scores["returns"]
+
+def test_fallback_intent_only_when_nothing_specific_matched(matcher):
+    assert matcher.analyze("help with shipping please").intent == "shipping"
+    assert matcher.analyze("help me").intent == "general_help"
+    assert matcher.analyze("hello").intent == "general_help"
+    assert matcher.analyze("hello").scores == {}
+
+def test_ties_go_to_table_order(matcher):
+    assert matcher.analyze("order to ship").intent == "order_status"
+
+def test_escalation(matcher):
+    assert matcher.analyze("I want the manager").escalation_keywords == ["manager"]
+    assert matcher.analyze("I want the manager").requires_human
+    assert matcher.analyze("what is your return policy").requires_human  # escalation intent
+    assert not matcher.analyze("where is my order").requires_human
+    # escalation phrases are not intent keywords
+    assert matcher.analyze("cancel my account").keywords == []
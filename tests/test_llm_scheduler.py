@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_scheduler import (
+    LLMScheduler, SchedulerTimeout, TokenBucket, parse_duration,
+    PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+)
+
+@pytest.mark.parametrize("value, seconds", [
+    ("7.66s", 7.66), ("2m59.56s", 179.56), ("120ms", 0.12), ("1h", 3600.0), ("30", 30.0), ("", None), ("soon", None),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+def test_token_bucket_is_unlimited_until_headers_arrive():
+    bucket = TokenBucket()
+    assert bucket.wait_time(10_000, 0.0) == 0.0
+
+    bucket.update(limit=100, remaining=10, reset=9.0, now=0.0)  # refills 10/s
+
+    assert bucket.wait_time(5, 0.0) == 0.0
+    assert bucket.wait_time(30, 0.0) == pytest.approx(2.0)
+    assert bucket.wait_time(500, 0.0) == pytest.approx(9.0)  # oversize waits for a full bucket
+
+def test_full_bucket_does_not_stall_without_a_refill_rate():
+    bucket = TokenBucket()
+    bucket.update(limit=100, remaining=100, reset=5.0, now=0.0)  # full: no rate to learn
+    bucket.take(100, 0.0)
+
+    assert bucket.wait_time(10, 0.0) == 0.0
+
+    bucket.update(limit=100, remaining=50, reset=5.0, now=1.0)  # refills 10/s
+    bucket.update(limit=100, remaining=100, reset=5.0, now=1.0)  # keeps the learned rate
+    assert bucket.wait_time(10, 1.0) == pytest.approx(1.0)
+
+def test_headers_only_lower_the_local_estimate():
+    bucket = TokenBucket()
+    bucket.update(limit=100, remaining=50, reset=5.0, now=0.0)
+    bucket.take(40, 0.0)
+    bucket.update(limit=100, remaining=50, reset=5.0, now=0.0)  # stale header from before the take
+
+    assert bucket.level == 10
+
+def test_waiters_are_granted_by_lane_then_arrival():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=1, low_priority_share=1.0)
+        order = []
+        await scheduler.acquire("m", 1)
+
+        async def wait(name, priority):
+            async with scheduler.slot("m", 1, priority):
+                order.append(name)
+
+        tasks = [asyncio.create_task(wait(name, priority)) for name, priority in
+                 [("low", PRIORITY_LOW), ("normal-1", PRIORITY_NORMAL), ("high", PRIORITY_HIGH), ("normal-2", PRIORITY_NORMAL)]]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["high", "normal-1", "normal-2", "low"]
+    assert scheduler.in_flight == 0
+
+def test_low_lane_keeps_slots_free_for_interactive_traffic():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=4, low_priority_share=0.5)
+        for _ in range(2):
+            await scheduler.acquire("m", 1, PRIORITY_LOW)
+        with pytest.raises(SchedulerTimeout):
+            await scheduler.acquire("m", 1, PRIORITY_LOW, timeout=0.05)
+        await scheduler.acquire("m", 1, PRIORITY_NORMAL, timeout=0.05)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.in_flight == 3
+    assert scheduler.timed_out == 1
+    assert scheduler.stats()["queued"] == 0
+
+def test_rate_limited_model_is_held_until_retry_after():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=4, low_priority_share=0.5)
+        scheduler.observe("m", 429, {"retry-after": "0.2"})
+        with pytest.raises(SchedulerTimeout):
+            await scheduler.acquire("m", 1, timeout=0.05)
+        await scheduler.acquire("other", 1, timeout=0.05)  # other models are unaffected
+        await scheduler.acquire("m", 1, timeout=1.0)
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from app.services import conversation_manager as conversation_module
+from app.models.database import Customer, secure_session
+from app.services.ai_service import ai_service
+from app.services.conversation_manager import ConversationManager
+from app.services.keyword_matcher import keyword_matcher
+from app.services.order_lookup import FileOrderSource, OrderService, OrderSource
+from config.security import encryptor
+from config.settings import settings
+
+@pytest.fixture
+def order_service(monkeypatch):
+    service = OrderService(
+        source=FileOrderSource("config/orders_sample.json"),
+        pattern=settings.ORDER_ID_PATTERN,
+        ttl=settings.ORDER_CACHE_TTL,
+        context_max=settings.ORDER_CONTEXT_MAX
+    )
+    monkeypatch.setattr(conversation_module, "order_service", service)
+    monkeypatch.setattr(settings, "ORDER_DIRECT_ANSWERS", True)
+    return service
+
+def attach(db, message, email="maria@example.com"):
+    context = {}
+    ConversationManager(db)._attach_orders(context, encryptor.blind_index(email, "email"), message,
+                                           keyword_matcher.analyze(message))
+    return context
+
+@pytest.mark.parametrize("message", [
+    "Where is my order ORD12345?",
+    "When will ORD12345 arrive?",
+    "Has ORD12345 shipped yet?",
+])
+def test_status_questions_get_a_direct_answer(db, order_service, message):
+    context = attach(db, message)
+
+    assert context["order_answer"].startswith("Here's the latest on your order")
+    assert "ORD12345: shipped" in context["order_answer"]
+
+@pytest.mark.parametrize("message", [
+    "I want to cancel ORD12345",
+    "change the address on ORD12345",
+    "ORD12345 arrived damaged",
+    "Where is my order ORD12345? I want a refund",
+    "ORD12345",  # no status cue
+    "Where is my order ORD12345? I want to speak to a manager",
+])
+def test_other_order_messages_go_to_the_llm(db, order_service, message):
+    context = attach(db, message)
+
+    assert "order_answer" not in context
+    assert any("ORD12345" in summary for summary in context["recent_orders"])
+
+def test_unknown_order_gets_no_direct_answer(db, order_service):
+    context = attach(db, "Where is my order ORD99999?")
+
+    assert "order_answer" not in context
+    assert "Order ORD99999: not found" in context["recent_orders"][-1]
+
+def test_unverified_asker_sees_status_only(db, order_service):
+    answer = attach(db, "Where is my order ORD12345?", email="someone@else.com")["order_answer"]
+
+    assert "shipped" in answer
+    assert "tracking" not in answer and "Blue linen shirt" not in answer
+
+def test_order_source_is_abstract():
+    with pytest.raises(TypeError):
+        OrderSource()
+
+def test_refresh_is_left_to_the_callers_transaction(db, order_service):
+    db.add(Customer(social_media_id="ig_pending", platform="instagram"))
+    db.flush()
+
+    first = order_service.orders_for_message(db, "Where is my order ORD12345?", None)
+    other = secure_session.SessionLocal()
+    try:
+        assert other.query(Customer).count() == 0  # nothing committed behind the caller's back
+    finally:
+        other.close()
+    db.commit()
+
+    assert first["mentioned"]["ORD12345"]["status"] == "shipped"
+    order_service.orders_for_message(db, "Where is my order ORD12345?", None)
+    assert order_service.stats()["cache_hits"] == 1  # stored by the caller's commit
+
+def test_batch_answers_status_questions_without_the_llm(db, order_service, monkeypatch):
+    prompts = []
+
+    async def answer(user_message, match, customer_context, *args, **kwargs):
+        prompts.append((user_message, list(customer_context["recent_orders"])))
+        return ai_service._build_result(match, "Happy to help!")
+
+    monkeypatch.setattr(ai_service, "_agenerate_uncached", answer)
+    results = asyncio.run(ConversationManager(db).aprocess_batch([
+        {"platform": "instagram", "social_media_id": "ig_batch", "message": "Where is my order ORD12345?"},
+        {"platform": "instagram", "social_media_id": "ig_batch", "message": "ORD12346 arrived damaged"},
+    ]))
+
+    assert "ORD12345: shipped" in results[0]["response"]
+    assert [message for message, _ in prompts] == ["ORD12346 arrived damaged"]
+    assert any("ORD12346" in summary for summary in prompts[0][1])
+    assert order_service.stats()["lookups"] == 2
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.database import Conversation, Customer
+from app.utils.pagination import decode_cursor, encode_cursor
+from main import app
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+def pages(client, url, key, limit):
+    """Follow next_cursor to the end, returning every page"""
+    result = []
+    cursor = None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        body = client.get(url, params=params).json()
+        result.append(body[key])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return result
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42, "x"), 2) == [42, "x"]
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(42), 2)
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor!", 1)
+
+def test_conversations_same_second_are_not_skipped(db, client):
+    # Rows inserted together share created_at (second resolution on SQLite)
+    db.add_all([Conversation(customer_id=7, platform="instagram", message_text=f"m{n}", ai_response="ok")
+                for n in range(7)])
+    db.add(Conversation(customer_id=8, platform="instagram", message_text="other", ai_response="ok"))
+    db.commit()
+
+    result = pages(client, "/conversations/7", "conversations", limit=2)
+
+    assert [len(page) for page in result] == [2, 2, 2, 1]
+    assert [row["user_message"] for page in result for row in page] == [f"m{n}" for n in range(7)]
+
+def test_customers_pages_cover_every_row_once(db, client):
+    db.add_all([Customer(social_media_id=f"ig_{n}", platform="instagram") for n in range(5)])
+    db.commit()
+
+    result = pages(client, "/customers/", "customers", limit=2)
+
+    ids = [row["id"] for page in result for row in page]
+    assert len(result) == 3
+    assert ids == sorted(set(ids)) and len(ids) == 5
+
+def test_exact_multiple_of_limit_has_no_empty_last_page(db, client):
+    db.add_all([Conversation(customer_id=7, platform="instagram", message_text=f"m{n}") for n in range(4)])
+    db.commit()
+
+    assert [len(page) for page in pages(client, "/conversations/7", "conversations", limit=2)] == [2, 2]
+
+def test_malformed_cursor_is_400(client):
+    assert client.get("/conversations/7", params={"cursor": "bogus"}).status_code == 400
+    assert client.get("/customers/", params={"cursor": encode_cursor(1, 2)}).status_code == 400
+
+def test_stream_returns_rows_after_cursor(db, client):
+    db.add_all([Conversation(customer_id=7, platform="instagram", message_text=f"m{n}") for n in range(3)])
+    db.commit()
+    first = client.get("/conversations/7", params={"limit": 1}).json()
+
+    lines = client.get("/conversations/7", params={"cursor": first["next_cursor"], "stream": True}).text.splitlines()
+
+    assert len(lines) == 2
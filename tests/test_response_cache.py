@@ -0,0 +1,50 @@
+import pytest
+
+from app.services.response_cache import ResponseCache
+
+@pytest.fixture
+def cache():
+    return ResponseCache(max_entries=2, ttls={"shipping": 3600, "order_status": 0}, default_ttl=900, min_similarity=0.8)
+
+def answer(text="Shipping takes 3-5 business days."):
+    return {"response": text, "intent": "shipping", "requires_human": False, "confidence": 0.9}
+
+def test_exact_and_near_duplicate_hits(cache):
+    cache.put(cache.make_key("How long does shipping take?", "shipping"), answer())
+
+    assert cache.get(cache.make_key("how long does shipping take", "shipping"))["cached"] == "exact"
+    assert cache.get(cache.make_key("How long does shipping take, please?", "shipping"))["cached"] == "near"
+    assert cache.get(cache.make_key("Do you ship to Canada?", "shipping")) is None
+
+def test_near_duplicates_never_cross_intents(cache):
+    cache.put(cache.make_key("How long does shipping take?", "shipping"), answer())
+
+    assert cache.get(cache.make_key("How long does shipping take, please?", "returns")) is None
+
+@pytest.mark.parametrize("context, history", [
+    ({"conversation_summary": {"turns": 2, "intent_counts": {}, "notes": []}}, None),
+    ({}, [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]),
+    ({"recent_orders": ["Order ORD12345: shipped"]}, None),
+])
+def test_customer_specific_prompts_bypass_the_cache(cache, context, history):
+    assert cache.make_key("How long does shipping take?", "shipping", context, history) is None
+    assert cache.bypassed == 1
+
+def test_uncacheable_messages(cache):
+    assert cache.make_key("How long does shipping take?", "order_status") is None  # ttl 0
+    assert cache.make_key("Where is order 12345?", "shipping") is None  # digits are specific
+
+def test_personalised_answers_are_not_stored(cache):
+    key = cache.make_key("How long does shipping take?", "shipping", {"customer_name": "Maria Lopez"})
+    cache.put(key, answer("Hi Maria! Shipping takes 3-5 days."), {"customer_name": "Maria Lopez"})
+
+    assert cache.get(key) is None
+
+def test_lru_eviction(cache):
+    keys = [cache.make_key(message, "shipping") for message in ("do you ship to canada", "what is your return policy",
+                                                                 "do you have size guides")]
+    for key in keys:
+        cache.put(key, answer())
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get(keys[0]) is None
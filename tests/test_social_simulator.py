@@ -0,0 +1,10 @@
+from app.services.social_simulator import SocialSimulator
+
+def test_returning_evicted_user_is_not_a_new_conversation():
+    simulator = SocialSimulator(max_conversations=2)
+    for user_id in ["ig_customer_001", "wa_customer_002", "ig_customer_003", "ig_customer_001", "wa_customer_002"]:
+        simulator.simulate_incoming_message(user_id=user_id, text="hi")
+
+    stats = simulator.get_demo_statistics()
+    assert stats["total_conversations"] == 3
+    assert stats["tracked_conversations"] == 2